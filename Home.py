@@ -1,4 +1,5 @@
 import streamlit as st
+from utils.face_workers import preload
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -8,6 +9,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# --- Face Analysis Preload ---
+# Opt-in (MINDMATE_FACE_PRELOAD=1): load the face models while the user logs in instead of on the scan tab
+preload()
+
 # --- User Session Management ---
 if "username" not in st.session_state:
     st.session_state.username = ""
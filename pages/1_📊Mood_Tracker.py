@@ -1,120 +1,72 @@
 import streamlit as st
 import datetime
 import pandas as pd
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
-import os
-import traceback
-from deepface import DeepFace
+import concurrent.futures
+import hashlib
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
-import tempfile
-import cv2
-import numpy as np
+from utils.chart_cache import cached_chart
+from utils.face_workers import (
+    BURST_FRAMES, FaceWorkersBusy, analyze_burst_bytes, analyze_clip_bytes, analyze_face_bytes, start_workers,
+)
+from utils.model_assets import REQUIRED_MODELS, available, health_check
+from utils.report_builder import get_report_job, get_or_start_report_job
+from utils.data_store import load_user_history, load_user_aggregate, get_user_data_version, add_new_log, clear_today_log
 
 # --- AI and Environment Setup ---
 load_dotenv()
 if 'llm' not in st.session_state:
     st.session_state.llm = ChatGroq(temperature=0, model_name="llama-3.1-8b-instant")
-DATA_FILE = "mood_logs.csv"
-
-# --- Data Persistence Functions ---
-def load_data():
-    if os.path.exists(DATA_FILE):
-        try: 
-            return pd.read_csv(DATA_FILE)
-        except pd.errors.EmptyDataError: 
-            return pd.DataFrame(columns=["date", "mood", "note", "username"])
-    return pd.DataFrame(columns=["date", "mood", "note", "username"])
-
-def save_data(all_data_df):
-    if 'note' not in all_data_df.columns: 
-        all_data_df['note'] = ''
-    all_data_df['note'] = all_data_df['note'].fillna('')
-    all_data_df.to_csv(DATA_FILE, index=False)
-    
-def add_new_log(username, new_log_entry):
-    all_data = load_data().to_dict('records')
-    new_log_entry['username'] = username
-    all_data.append(new_log_entry)
-    save_data(pd.DataFrame(all_data))
-    
-def clear_today_log(username, today_iso):
-    df = load_data()
-    df_filtered = df[~((df['username'] == username) & (df['date'] == today_iso))]
-    save_data(df_filtered)
 
 # --- Helper Functions ---
-def get_temp_file_path(uploaded_file):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        return tmp_file.name
-        
+@st.cache_resource
+def load_face_workers():
+    # Once per server process, when the scan tab is first reached. The vision stack loads off the
+    # script thread (worker processes or a warm-up thread), so this page never imports DeepFace/TensorFlow itself.
+    start_workers()
+    return {model: status for model, status in health_check(REQUIRED_MODELS).items() if not available(model)}
+
 def analyze_mood_from_text(text_note):
     prompt = PromptTemplate(input_variables=["note"], 
                            template="Analyze a journal entry. Classify mood: Happy, Sad, Anxious, Angry, Neutral. Respond ONLY with the single word. Entry: \"{note}\" Mood:")
     chain = prompt | st.session_state.llm
     return chain.invoke({"note": text_note}).content.strip()
 
+FACE_BUSY_MESSAGE = "Face analysis is busy right now. Please try again in a moment, or log your mood with text instead."
+FACE_TIMEOUT_MESSAGE = "Face analysis took too long. Please try again, or log your mood with text instead."
+
 def detect_emotion_from_face(face_image):
     """
-    Fixed face emotion detection without the 'silent' parameter
-    Based on DeepFace documentation and compatibility requirements
+    Run the captured image through the shared detector scheduler and the
+    emotion classifier, reporting which backend found the face and how long it took.
     """
-    img_path = None
     try:
-        # Save the uploaded image to a temporary file path
-        img_path = get_temp_file_path(face_image)
-        
-        # Try multiple detectors in order of reliability
-        detectors = ['retinaface', 'mtcnn', 'opencv', 'ssd', 'dlib']
-        detected_mood = None
-        
-        for detector in detectors:
-            try:
-                # Remove the 'silent' parameter as it's not supported
-                analysis = DeepFace.analyze(
-                    img_path=img_path,
-                    actions=['emotion'],
-                    enforce_detection=True,
-                    detector_backend=detector
-                    # 'silent' parameter removed to fix the error
-                )
-                
-                if isinstance(analysis, list) and len(analysis) > 0:
-                    detected_mood = analysis[0]['dominant_emotion'].capitalize()
-                    st.success(f"Face detected using {detector} backend")
-                    break
-                    
-            except Exception as e:
-                st.write(f"Detector {detector} failed: {str(e)}")
-                continue
-        
-        # Fallback with enforce_detection=False
-        if detected_mood is None:
-            try:
-                analysis = DeepFace.analyze(
-                    img_path=img_path,
-                    actions=['emotion'],
-                    enforce_detection=False,
-                    detector_backend='opencv'
-                    # 'silent' parameter removed to fix the error
-                )
-                
-                if isinstance(analysis, list) and len(analysis) > 0:
-                    detected_mood = analysis[0]['dominant_emotion'].capitalize()
-                    st.info("Face detected with low confidence")
-            except Exception as e:
-                st.error(f"All detection methods failed: {str(e)}")
-                return None
-        
-        return detected_mood
+        # Runs on the shared worker pool, so a burst of scans can't stall this server process
+        result = analyze_face_bytes(face_image.getvalue())
 
+        for backend, seconds, error in result["attempts"]:
+            if error:
+                st.write(f"Detector {backend} failed after {seconds:.2f}s: {error}")
+
+        if result["mood"] is None:
+            st.error("All detection methods failed.")
+            return None
+        if result["low_confidence"]:
+            st.info("Face detected with low confidence")
+        else:
+            st.success(f"Face detected using {result['backend']} backend in {result['seconds']:.2f}s "
+                       f"({result['total_seconds']:.2f}s total)")
+        return result["mood"]
+
+    except FaceWorkersBusy:
+        st.warning(FACE_BUSY_MESSAGE)
+        return None
+    except concurrent.futures.TimeoutError:
+        st.error(FACE_TIMEOUT_MESSAGE)
+        return None
     except Exception as e:
         st.error(f"Face analysis error: {str(e)}")
         # Provide user guidance for better detection
@@ -127,96 +79,99 @@ def detect_emotion_from_face(face_image):
         - Try to maintain a neutral expression
         """)
         return None
-    finally:
-        # Clean up the temporary file
-        if img_path and os.path.exists(img_path):
-            os.remove(img_path)
+
+def detect_emotion_from_frames(images=None, clip=None):
+    """
+    Burst or clip scan: every face found goes through the emotion model in one
+    batch and the per-frame predictions are combined by confidence.
+    """
+    try:
+        result = analyze_clip_bytes(clip) if clip is not None else analyze_burst_bytes(images)
+    except FaceWorkersBusy:
+        st.warning(FACE_BUSY_MESSAGE)
+        return None
+    except concurrent.futures.TimeoutError:
+        st.error(FACE_TIMEOUT_MESSAGE)
+        return None
+    except Exception as e:
+        st.error(f"Face analysis error: {str(e)}")
+        return None
+
+    if result["mood"] is None:
+        st.error(f"No face found in any of the {result['frames']} frames.")
+        return None
+    st.success(f"Combined {result['faces']} faces from {result['frames']} frames "
+               f"({result['confidence']:.0%} confidence, {result['total_seconds']:.2f}s)")
+    st.caption("Per frame: " + ", ".join(result["frame_moods"]))
+    return result["mood"]
+
+def log_face_scan(username, today, scan_key, detected_mood, note):
+    """Write the scan result once per captured image, burst or clip."""
+    logged_scans = st.session_state.setdefault("face_logged_frames", set())
+    if scan_key in logged_scans:
+        st.info(f"This scan was already logged as **{detected_mood}**. Take a new one to log again.")
+        return
+    entry = {"date": today, "mood": detected_mood, "note": note}
+    add_new_log(username, entry).result()
+    logged_scans.add(scan_key)
+    st.success(f"😊 Detected Mood: **{detected_mood}**")
             
             
             
-# --- PDF Report Generation ---
-def split_text(text, max_chars):
-    words = str(text).split()
-    lines, line = [], ""
-    for word in words:
-        if len(line + " " + word) <= max_chars:
-            line += " " + word if line else word
-        else:
-            lines.append(line)
-            line = word
-    if line:
-        lines.append(line)
-    return lines
-
-def generate_summary(logs):
-    mood_count = {}
-    for entry in logs:
-        mood = entry["mood"]
-        mood_count[mood] = mood_count.get(mood, 0) + 1
-    return mood_count
-
-def generate_pdf(log_data):
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    y = height - 50
-    
-    p.setFont("Helvetica-Bold", 18)
-    p.drawString(50, y, "🧠 MindMates Mood Log Report")
-    y -= 20
-    
-    p.setFont("Helvetica-Oblique", 10)
-    p.drawString(50, y, f"Generated for {log_data[0]['username']} on: {datetime.datetime.now().strftime('%B %d, %Y')}")
-    y -= 30
-    
-    mood_summary = generate_summary(log_data)
-    total_logs = len(log_data)
-    
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y, f"Total Entries: {total_logs}")
-    y -= 20
-    
-    p.setFont("Helvetica", 11)
-    for mood, count in mood_summary.items():
-        p.drawString(70, y, f"• {mood}: {count}")
-        y -= 15
-    
-    y -= 10
-    p.line(50, y, width - 50, y)
-    y -= 30
+# --- Charts ---
+# Dark theme to match the app
+MOOD_DISTRIBUTION_STYLE = {"theme": "dark_background", "bar_color": "#8B5CF6", "text_color": "white"}
+
+def draw_mood_distribution(mood_counts, style):
+    fig, ax = plt.subplots()
+    moods = [mood for mood, _ in mood_counts]
+    counts = [count for _, count in mood_counts]
     
-    p.setFont("Helvetica", 12)
-    entry_number = 1
+    bars = ax.bar(moods, counts, color=style["bar_color"])
     
-    for entry in reversed(log_data):
-        if y < 100:
-            p.showPage()
-            y = height - 50
-            p.setFont("Helvetica", 12)
-        
-        p.setFillColor(colors.darkblue)
-        p.setFont("Helvetica-Bold", 12)
-        p.drawString(50, y, f"{entry_number}. {entry['date']} — {entry['mood']}")
-        y -= 20
-        
-        note = entry.get('note', '')
-        if pd.notna(note) and str(note).strip():
-            p.setFont("Helvetica", 11)
-            p.setFillColor(colors.black)
-            wrapped_lines = split_text(note, 85)
-            for line in wrapped_lines:
-                p.drawString(70, y, "📝 " + line)
-                y -= 15
-            y -= 5
-        
-        p.setFillColor(colors.grey)
-        p.line(50, y, width - 50, y)
-        y -= 25
-        entry_number += 1
+    # Add data labels on top of each bar for clarity
+    ax.bar_label(bars, padding=3, color=style["text_color"])
+
+    # Styling the chart for better readability
+    ax.set_ylabel("Count of Days", color=style["text_color"])
+    ax.set_title("Mood Distribution", color=style["text_color"])
+    ax.tick_params(axis='x', colors=style["text_color"], rotation=25)
+    ax.tick_params(axis='y', colors=style["text_color"])
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
     
-    p.save()
-    buffer.seek(0)
-    return buffer
+    # Ensure Y-axis uses whole numbers and has a better scale
+    max_count = max(counts)
+    ax.set_ylim(0, max(max_count + 1, 4))  # Set a minimum height of 4 for scale
+    ax.yaxis.set_major_locator(mticker.MaxNLocator(integer=True))
+    return fig
+
+# --- Mood History Rendering ---
+HISTORY_PAGE_SIZE = 20
+
+# (background, text) colours per mood
+MOOD_STYLES = {
+    "Happy": ("#d4edda", "#155724"),
+    "Neutral": ("#e2e3e5", "#383d41"),
+    "Anxious": ("#fff3cd", "#856404"),
+    "Sad": ("#d1ecf1", "#0c5460"),
+    "Angry": ("#f8d7da", "#721c24"),
+}
+DEFAULT_MOOD_STYLE = ("#f0f2f6", "#333")
+
+def render_history_entry(date, mood, note):
+    mood_color, text_color = MOOD_STYLES.get(mood, DEFAULT_MOOD_STYLE)
+    display_note = ""
+    if pd.notna(note) and str(note).strip():
+        display_note = f"📝 {str(note)}"
+    return f"""
+        <div style="background-color:{mood_color}; color:{text_color}; padding:12px; 
+                    border-left: 5px solid {text_color}; border-radius:8px; margin-bottom:10px;">
+            <strong>{date}</strong><br>
+            Mood: <span style="font-size:18px; font-weight:bold;">{mood}</span><br>
+            {display_note}
+        </div>
+        """
 
 # --- Main Page Logic ---
 st.title("🧠 Mood Tracker")
@@ -228,16 +183,15 @@ if "username" not in st.session_state or not st.session_state.username:
 username = st.session_state.username
 st.markdown(f"Logging mood for **{username}**.")
 
-all_logs_df = load_data()
-user_logs = all_logs_df[all_logs_df["username"] == username].to_dict('records')
+user_stats = load_user_aggregate(username)
 
 today = datetime.date.today().isoformat()
-already_logged_today = any(entry["date"] == today for entry in user_logs)
+already_logged_today = user_stats.logged_on(today)
 
 if already_logged_today:
     st.success("✅ You've already logged your mood today. See your history and analysis below.")
     if st.button("Log a Different Mood for Today"):
-        clear_today_log(username, today)
+        clear_today_log(username, today).result()
         st.rerun()
 else:
     tab1, tab2 = st.tabs(["✍️ Log with Text/Emoji", "📸 Scan with AI"])
@@ -262,113 +216,199 @@ else:
                     st.stop()
                 
                 entry = {"date": today, "mood": final_mood, "note": note.strip()}
-                add_new_log(username, entry)
+                # Wait for the write queue to flush so the rerun sees the new entry
+                add_new_log(username, entry).result()
                 st.success(f"Mood logged as: **{final_mood}**")
                 st.rerun()
 
     with tab2:
         st.subheader("Let AI detect your mood")
         st.info("💡 For best results: Ensure good lighting, face the camera directly, and remove sunglasses/hats")
-        
-        face_image = st.camera_input("Take a picture to detect your mood")
-        
-        if face_image:
-            # Display the captured image for user confirmation
-            st.image(face_image, caption="Captured Image", use_column_width=True)
-            
-            detected_mood = None
-            with st.spinner("Analyzing your expression..."):
-                detected_mood = detect_emotion_from_face(face_image)
+        missing_models = load_face_workers()
+        if missing_models:
+            st.warning("Some face analysis models are not installed on this server: "
+                       + "; ".join(f"{model} ({status})" for model, status in missing_models.items()))
+
+        # camera_input keeps its last frame across reruns, so results are keyed on the image content
+        face_scans = st.session_state.setdefault("face_scans", {})
+        scan_mode = st.radio("Scan mode", ["📷 Single photo", "🎞️ Burst", "📁 Upload a clip"], horizontal=True, key="scan_mode")
+
+        if scan_mode == "📷 Single photo":
+            face_image = st.camera_input("Take a picture to detect your mood")
             
-            if detected_mood:
-                entry = {"date": today, "mood": detected_mood, "note": "Auto-detected via face scan"}
-                add_new_log(username, entry)
-                st.success(f"😊 Detected Mood: **{detected_mood}**")
+            if face_image:
+                # Display the captured image for user confirmation
+                st.image(face_image, caption="Captured Image", use_column_width=True)
                 
-                # Add confirmation buttons
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button("Confirm and Save", key="confirm_mood"):
-                        st.rerun()
-                with col2:
-                    if st.button("Try Again", key="retry_mood"):
-                        st.session_state.retry_face = True
-                        st.rerun()
-            else:
-                st.error("""
-                **Face analysis failed.** Possible reasons:
-                - No face detected in the image
-                - Poor lighting conditions
-                - Face obstructed or not clearly visible
-                """)
-                st.info("Please try again or use the text entry method instead.")
+                frame_hash = hashlib.sha256(face_image.getvalue()).hexdigest()
+                detected_mood = face_scans.get(frame_hash)
+                if detected_mood is None:
+                    with st.spinner("Analyzing your expression..."):
+                        detected_mood = detect_emotion_from_face(face_image)
+                    # Failures aren't remembered: a busy or timed-out scan deserves a retry
+                    if detected_mood:
+                        face_scans[frame_hash] = detected_mood
+                
+                if detected_mood:
+                    log_face_scan(username, today, frame_hash, detected_mood, "Auto-detected via face scan")
+                    
+                    # Add confirmation buttons
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if st.button("Confirm and Save", key="confirm_mood"):
+                            st.rerun()
+                    with col2:
+                        if st.button("Try Again", key="retry_mood"):
+                            st.session_state.retry_face = True
+                            st.rerun()
+                else:
+                    st.error("""
+                    **Face analysis failed.** Possible reasons:
+                    - No face detected in the image
+                    - Poor lighting conditions
+                    - Face obstructed or not clearly visible
+                    """)
+                    st.info("Please try again or use the text entry method instead.")
+
+        elif scan_mode == "🎞️ Burst":
+            st.caption(f"Take up to {BURST_FRAMES} pictures, then analyze them together so one blink doesn't decide your mood.")
+            burst = st.session_state.setdefault("burst_frames", {})
+            # The camera keeps offering its last shot, so each shot is only ever added once
+            seen_shots = st.session_state.setdefault("burst_seen_shots", set())
+            shot = st.camera_input("Add a picture to the burst", key="burst_camera")
+            if shot:
+                shot_hash = hashlib.sha256(shot.getvalue()).hexdigest()
+                if shot_hash not in seen_shots and len(burst) < BURST_FRAMES:
+                    burst[shot_hash] = shot.getvalue()
+                    seen_shots.add(shot_hash)
+
+            if burst:
+                st.image(list(burst.values()), width=120)
+            col1, col2 = st.columns(2)
+            with col1:
+                run_burst = st.button(f"Analyze {len(burst)} pictures", disabled=len(burst) < 2, key="analyze_burst")
+            with col2:
+                if st.button("Start over", disabled=not burst, key="clear_burst"):
+                    burst.clear()
+                    st.rerun()
+
+            burst_key = "burst:" + hashlib.sha256("".join(burst).encode()).hexdigest()
+            detected_mood = face_scans.get(burst_key)
+            if detected_mood is None and run_burst:
+                with st.spinner(f"Analyzing {len(burst)} pictures..."):
+                    detected_mood = detect_emotion_from_frames(images=list(burst.values()))
+                if detected_mood:
+                    face_scans[burst_key] = detected_mood
+            if detected_mood:
+                log_face_scan(username, today, burst_key, detected_mood, f"Auto-detected via {len(burst)}-picture face scan")
+
+        else:
+            st.caption(f"Upload a few seconds of video; {BURST_FRAMES} evenly spaced frames are analyzed together.")
+            clip = st.file_uploader("Short video clip", type=["mp4", "mov", "webm", "avi"], key="scan_clip")
+            if clip:
+                clip_key = "clip:" + hashlib.sha256(clip.getvalue()).hexdigest()
+                detected_mood = face_scans.get(clip_key)
+                if detected_mood is None and st.button("Analyze clip", key="analyze_clip"):
+                    with st.spinner("Analyzing your clip..."):
+                        detected_mood = detect_emotion_from_frames(clip=clip.getvalue())
+                    if detected_mood:
+                        face_scans[clip_key] = detected_mood
+                if detected_mood:
+                    log_face_scan(username, today, clip_key, detected_mood, "Auto-detected via video face scan")
 
 # --- Mood History and Analysis Display ---
-if user_logs:
+if user_stats.entry_count:
     st.markdown("---")
     st.subheader("📅 Your Mood Log History")
     
-    for entry in reversed(user_logs):
-        mood_color_map = {"Happy": "#d4edda", "Neutral": "#e2e3e5", "Anxious": "#fff3cd", 
-                         "Sad": "#d1ecf1", "Angry": "#f8d7da"}
-        text_color_map = {"Happy": "#155724", "Neutral": "#383d41", "Anxious": "#856404", 
-                         "Sad": "#0c5460", "Angry": "#721c24"}
-        
-        mood_color = mood_color_map.get(entry["mood"], "#f0f2f6")
-        text_color = text_color_map.get(entry["mood"], "#333")
-        note_text = entry.get('note', '')
-        display_note = ""
-        
-        if pd.notna(note_text) and str(note_text).strip():
-            display_note = f"📝 {str(note_text)}"
-        
-        st.markdown(f"""
-        <div style="background-color:{mood_color}; color:{text_color}; padding:12px; 
-                    border-left: 5px solid {text_color}; border-radius:8px; margin-bottom:10px;">
-            <strong>{entry['date']}</strong><br>
-            Mood: <span style="font-size:18px; font-weight:bold;">{entry['mood']}</span><br>
-            {display_note}
-        </div>
-        """, unsafe_allow_html=True)
+    user_history = load_user_history(username)
+    today_date = datetime.date.today()
+    first_date = user_history.first_date() or today_date
+    date_range = st.date_input("Show entries between", value=(first_date, today_date), key="history_range")
+    # While a range is being picked the widget briefly holds only the start date
+    if len(date_range) == 2:
+        start_date, end_date = date_range
+    elif len(date_range) == 1:
+        start_date = end_date = date_range[0]
+    else:
+        start_date, end_date = first_date, today_date
+
+    # "Load more" cursor: how many of the newest entries in the range to show
+    if st.session_state.get("history_shown_range") != (start_date, end_date):
+        st.session_state.history_shown_range = (start_date, end_date)
+        st.session_state.history_limit = HISTORY_PAGE_SIZE
+
+    entries_in_range = user_history.between(start_date, end_date)
+    page = entries_in_range.tail(st.session_state.history_limit).to_frame()
+    # One markdown element for the whole page instead of one per entry
+    st.markdown(
+        "".join(
+            render_history_entry(date, mood, note)
+            for date, mood, note in zip(page["date"][::-1], page["mood"][::-1], page["note"][::-1])
+        ),
+        unsafe_allow_html=True,
+    )
+
+    st.caption(f"Showing {len(page)} of {len(entries_in_range)} entries in this range")
+    if len(entries_in_range) > len(page):
+        if st.button("Load more", key="history_load_more"):
+            st.session_state.history_limit += HISTORY_PAGE_SIZE
+            st.rerun()
 
     st.markdown("---")
     st.subheader("📊 Mood Analysis & Report")
     
-    mood_summary = generate_summary(user_logs)
+    # Counts are kept up to date on every write, no need to walk the history
+    mood_summary = user_stats.mood_counts
     if mood_summary:
-        # Create the plot with a dark theme to match your app
-        plt.style.use('dark_background')
-        fig, ax = plt.subplots()
-        
-        bars = ax.bar(mood_summary.keys(), mood_summary.values(), color="#8B5CF6")
-        
-        # Add data labels on top of each bar for clarity
-        ax.bar_label(bars, padding=3, color='white')
-
-        # Styling the chart for better readability
-        ax.set_ylabel("Count of Days", color='white')
-        ax.set_title("Mood Distribution", color='white')
-        ax.tick_params(axis='x', colors='white', rotation=25)
-        ax.tick_params(axis='y', colors='white')
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        
-        # Ensure Y-axis uses whole numbers and has a better scale
-        max_count = max(mood_summary.values())
-        ax.set_ylim(0, max(max_count + 1, 4))  # Set a minimum height of 4 for scale
-        ax.yaxis.set_major_locator(mticker.MaxNLocator(integer=True))
-
-        st.pyplot(fig)
+        # Rendered once per distinct set of counts, then served from the chart cache
+        chart_png = cached_chart(
+            "mood_distribution", tuple(mood_summary.items()), MOOD_DISTRIBUTION_STYLE, draw_mood_distribution, dpi=200
+        )
+        st.image(chart_png, use_column_width=True)
 
         # Improved layout for the download button
         st.markdown("<br>", unsafe_allow_html=True)
+        report_pages = st.number_input(
+            "Maximum report pages", min_value=1, max_value=500, value=50, step=10,
+            help="The report covers the date range selected above, newest entries first."
+        )
+        if len(entries_in_range) == len(user_history):
+            report_summary = user_stats.mood_counts
+        else:
+            report_summary = entries_in_range.mood_counts()
+        report_key = (username, get_user_data_version(username), start_date, end_date, report_pages)
+
         _, col2, _ = st.columns([1.5, 1, 1.5])
         with col2:
-            pdf_buffer = generate_pdf(user_logs)
-            st.download_button(
-                "📥 Download Full Report (PDF)", 
-                pdf_buffer, 
-                "MindMates_Mood_Log.pdf", 
-                "application/pdf", 
-                use_container_width=True
-            )
\ No newline at end of file
+            # The PDF is built on a background worker only once asked for, one job per data version and options
+            report_job = get_report_job(report_key)
+            requested = report_job is not None and st.session_state.get("pdf_requested_key") == report_key
+            if requested and not report_job.done:
+                progress_bar = st.progress(report_job.progress, text="Building your report...")
+                while not report_job.wait(timeout=0.25):
+                    progress_bar.progress(report_job.progress, text=f"Building your report... {report_job.progress:.0%}")
+                progress_bar.empty()
+            if not requested or report_job.error:
+                if requested:
+                    # A failed job is restarted by get_or_start_report_job, so offer the button again.
+                    st.error(f"Could not build the report: {report_job.error}")
+                if st.button("📄 Prepare PDF Report", use_container_width=True):
+                    st.session_state.pdf_requested_key = report_key
+                    get_or_start_report_job(
+                        report_key,
+                        username=username,
+                        history=entries_in_range,
+                        mood_summary=dict(report_summary),
+                        total_entries=len(entries_in_range),
+                        max_pages=report_pages,
+                    )
+                    st.rerun()
+            else:
+                st.download_button(
+                    "📥 Download Full Report (PDF)", 
+                    report_job.read_bytes(), 
+                    "MindMates_Mood_Log.pdf", 
+                    "application/pdf", 
+                    use_container_width=True
+                )
@@ -1,10 +1,9 @@
 import streamlit as st
 import datetime
-import pandas as pd
-import os
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
+from utils.data_store import get_latest_mood
 
 # --- Page Configuration and Custom CSS ---
 st.set_page_config(page_title="AI Companion", page_icon="🧠")
@@ -48,7 +47,6 @@ add_custom_css()
 load_dotenv()
 if 'llm' not in st.session_state:
     st.session_state.llm = ChatGroq(temperature=0.7, model_name="llama-3.1-8b-instant")
-DATA_FILE = "mood_logs.csv"
 
 # --- Session State Initialization ---
 # Initialize all session state variables with proper default values
@@ -64,15 +62,6 @@ if 'user_input' not in st.session_state:
 if 'last_input' not in st.session_state:
     st.session_state.last_input = None
 
-# --- Data Connection Logic ---
-def load_data():
-    if os.path.exists(DATA_FILE):
-        try:
-            return pd.read_csv(DATA_FILE)
-        except pd.errors.EmptyDataError:
-            return pd.DataFrame(columns=["date", "mood", "note", "username"])
-    return pd.DataFrame(columns=["date", "mood", "note", "username"])
-
 def format_history(messages):
     history_str = ""
     for msg in messages:
@@ -109,16 +98,7 @@ if "username" not in st.session_state or not st.session_state.username:
     st.stop()
 
 username = st.session_state.username
-all_logs_df = load_data()
-user_logs_df = pd.DataFrame()
-
-if not all_logs_df.empty:
-    user_logs_df = all_logs_df[all_logs_df["username"] == username]
-
-latest_mood = "Calm"
-if not user_logs_df.empty and 'date' in user_logs_df.columns:
-    user_logs_df['date'] = pd.to_datetime(user_logs_df['date'])
-    latest_mood = user_logs_df.sort_values(by="date", ascending=False).iloc[0].get("mood", "Calm")
+latest_mood = get_latest_mood(username, default="Calm")
 
 st.info(f"MindMate is responding with a **{latest_mood.lower()}** tone based on your last entry.")
 
@@ -1,4 +1,3 @@
-import os
 import datetime
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -11,16 +10,12 @@ import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
 import streamlit as st
-
-# --- Data Connection Logic ---
-DATA_FILE = "mood_logs.csv"
-def load_data():
-    if os.path.exists(DATA_FILE):
-        try: 
-            return pd.read_csv(DATA_FILE)
-        except pd.errors.EmptyDataError: 
-            return pd.DataFrame(columns=["date", "mood", "note", "username"])
-    return pd.DataFrame(columns=["date", "mood", "note", "username"])
+from utils.analytics import long_range_summary
+from utils.chart_cache import cached_chart
+from utils.data_store import load_user_history, load_user_aggregate
+from utils.downsample import lttb
+from utils.mood_history import day_number
+from utils.mood_stats import MOOD_SCORES, DEFAULT_SCORE
 
 # --- Helper Functions ---
 def add_dashboard_styles():
@@ -63,6 +58,33 @@ def add_dashboard_styles():
             .calendar-day.empty {
                 background-color: #1E1E1E;
             }
+            .calendar-title {
+                text-align: center;
+            }
+            .calendar-grid {
+                display: grid;
+                grid-template-columns: repeat(7, 1fr);
+                gap: 0.4rem;
+            }
+            .calendar-head {
+                text-align: center;
+                font-weight: 600;
+            }
+            .year-grid {
+                display: grid;
+                grid-template-rows: repeat(7, 14px);
+                grid-auto-flow: column;
+                grid-auto-columns: 14px;
+                gap: 3px;
+                overflow-x: auto;
+            }
+            .year-cell {
+                border-radius: 3px;
+                background-color: #2E2E38;
+            }
+            .year-cell.empty {
+                background-color: transparent;
+            }
             .mood-5 { background-color: #4CAF50; color: white; }
             .mood-4 { background-color: #8BC34A; color: white; }
             .mood-3 { background-color: #FFEB3B; color: black; }
@@ -71,8 +93,68 @@ def add_dashboard_styles():
         </style>
     """, unsafe_allow_html=True)
 
+# --- Charts ---
+MOOD_TREND_STYLE = {"theme": "default", "line_color": "#667eea"}
+
+def draw_mood_trend(points, style):
+    """points: ((iso date, mood score), ...) in date order."""
+    dates = [datetime.date.fromisoformat(day) for day, _ in points]
+    scores = [score for _, score in points]
+    fig, ax = plt.subplots(figsize=(9, 4))
+    ax.plot(dates, scores, marker='o', linestyle='-', color=style["line_color"], linewidth=2)
+    ax.set_ylim(0, 6)
+    ax.set_yticks([1, 2, 3, 4, 5])
+    ax.set_yticklabels(["😢 Sad", "😟 Anxious", "😐 Neutral", "😊 Good", "😄 Happy"])
+    ax.grid(True, alpha=0.3)
+    ax.set_title("Your Mood Over the Past Week")
+
+    # ✅ Date-only formatting
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
+
+def thin_points(dates, values):
+    """(iso date, value) pairs, thinned with LTTB to the chart's point budget."""
+    keep = lttb(dates.to_numpy(dtype="datetime64[D]").astype(np.int64), values)
+    return tuple(zip(dates[keep].strftime("%Y-%m-%d"), values[keep]))
+
+def mood_trend_png(mood_df):
+    # Rendered once per distinct week of data; the page and the PDF share the same PNG.
+    points = thin_points(pd.DatetimeIndex(mood_df["Date"]), mood_df["Mood_Score"].to_numpy(dtype=float))
+    return cached_chart("mood_trend", points, MOOD_TREND_STYLE, draw_mood_trend, dpi=150)
+
+LONG_RANGE_STYLE = {"theme": "default", "point_color": "#A5B4FC", "line_color": "#667eea"}
+
+def draw_long_range_trend(points, style):
+    """points: (((iso date, daily average), ...), ((iso date, rolling average), ...)), days with entries only."""
+    daily, rolling = points
+    fig, ax = plt.subplots(figsize=(9, 4))
+    ax.scatter([datetime.date.fromisoformat(day) for day, _ in daily], [score for _, score in daily],
+               s=12, color=style["point_color"], label="Daily average")
+    ax.plot([datetime.date.fromisoformat(day) for day, _ in rolling], [score for _, score in rolling],
+            color=style["line_color"], linewidth=2, label="7-day average")
+    ax.set_ylim(0, 6)
+    ax.set_yticks([1, 2, 3, 4, 5])
+    ax.set_yticklabels(["😢 Sad", "😟 Anxious", "😐 Neutral", "😊 Good", "😄 Happy"])
+    ax.grid(True, alpha=0.3)
+    ax.legend(loc="upper left")
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
+
+def long_range_trend_png(summary):
+    daily = summary["daily"].dropna()
+    rolling = summary["rolling"].dropna()
+    points = (
+        thin_points(daily.index, daily.to_numpy(dtype=float)),
+        thin_points(rolling.index, rolling.to_numpy(dtype=float)),
+    )
+    return cached_chart("long_range_trend", points, LONG_RANGE_STYLE, draw_long_range_trend, dpi=150)
+
 # --- PDF GENERATION FUNCTION ---
-def generate_pdf_report(goals_checked, mood_df, username):
+def generate_pdf_report(goals_checked, trend_png, username):
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
@@ -102,35 +184,10 @@ def generate_pdf_report(goals_checked, mood_df, username):
     p.drawString(72, y_position, "📈 7-Day Mood Trend")
     y_position -= 220  # Make space for the chart
 
-    if not mood_df.empty and len(mood_df) > 1:
+    if trend_png:
         try:
-            # Ensure only date (not time) is used
-            mood_df = mood_df.copy()
-            mood_df["Date"] = pd.to_datetime(mood_df["Date"]).dt.date
-
-            # Create a plot specifically for the PDF
-            fig, ax = plt.subplots(figsize=(7, 3.5))
-            ax.plot(mood_df["Date"], mood_df["Mood_Score"], marker='o', linestyle='-', color='#667eea', linewidth=2)
-            
-            # Formatting for date-only X-axis
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            fig.autofmt_xdate()
-
-            # Styling for a light background PDF
-            ax.set_title("Recent Mood Trend", fontsize=12)
-            ax.set_xlabel("Date", fontsize=10)
-            ax.set_ylabel("Mood Score (1-5)", fontsize=10)
-            ax.grid(True, alpha=0.3)
-            plt.tight_layout()
-
-            # Save the plot to an in-memory buffer
-            img_buffer = BytesIO()
-            fig.savefig(img_buffer, format='PNG', dpi=150, bbox_inches='tight')
-            img_buffer.seek(0)
-            
-            # Draw image on PDF
-            p.drawImage(ImageReader(img_buffer), 72, y_position, width=450, height=200)
-            plt.close(fig)
+            # Same PNG the dashboard already shows, so no second render for the PDF
+            p.drawImage(ImageReader(BytesIO(trend_png)), 72, y_position, width=450, height=200)
         except Exception as e:
             p.setFont("Helvetica", 11)
             p.drawString(90, y_position + 100, f"Chart error: {str(e)}")
@@ -142,52 +199,58 @@ def generate_pdf_report(goals_checked, mood_df, username):
     buffer.seek(0)
     return buffer
 
-# --- MONTHLY CALENDAR FUNCTION ---
-def create_monthly_calendar(user_logs_df, current_date):
-    cal = calendar.monthcalendar(current_date.year, current_date.month)
-    mood_mapping = {"Happy": 5, "Neutral": 3, "Anxious": 2, "Sad": 1, "Angry": 1}
-    user_logs_df['Mood_Score'] = user_logs_df['mood'].map(mood_mapping).fillna(0)
-    
-    mood_by_date = {}
-    for _, row in user_logs_df.iterrows():
-        if pd.notna(row['Date']):
-            date_str = row['Date'].strftime('%Y-%m-%d')
-            mood_by_date[date_str] = row['Mood_Score']
-    
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        st.markdown(f"### {current_date.strftime('%B %Y')}")
-    
-    weekdays = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    cols = st.columns(7)
-    for i, col in enumerate(cols):
-        col.markdown(f"**{weekdays[i]}**", help=weekdays[i])
-    
-    for week in cal:
-        cols = st.columns(7)
-        for i, day in enumerate(week):
-            with cols[i]:
-                if day == 0:
-                    st.markdown('<div class="calendar-day empty"></div>', unsafe_allow_html=True)
-                else:
-                    date_str = f"{current_date.year}-{current_date.month:02d}-{day:02d}"
-                    mood_score = mood_by_date.get(date_str, 0)
-                    
-                    if mood_score > 0:
-                        mood_class = f"mood-{int(mood_score)}"
-                        mood_emoji = {5: "😄", 4: "😊", 3: "😐", 2: "😟", 1: "😢"}.get(int(mood_score), "")
-                        st.markdown(f'''
-                            <div class="calendar-day {mood_class}">
-                                <strong>{day}</strong><br>
-                                {mood_emoji}
-                            </div>
-                        ''', unsafe_allow_html=True)
-                    else:
-                        st.markdown(f'''
-                            <div class="calendar-day">
-                                <strong>{day}</strong>
-                            </div>
-                        ''', unsafe_allow_html=True)
+# --- CALENDAR FUNCTIONS ---
+MOOD_EMOJIS = {5: "😄", 4: "😊", 3: "😐", 2: "😟", 1: "😢"}
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+def daily_mood_scores(user_history, start_date, end_date):
+    """
+    Score of the last entry on each day from start_date to end_date (0 = nothing logged),
+    one slot per day, filled straight from the history's sorted day numbers.
+    """
+    scores = np.zeros((end_date - start_date).days + 1, dtype=np.int8)
+    span = user_history.between(start_date, end_date)
+    if span.empty:
+        return scores
+    # Entries are date-sorted, so the last one of each day is where the day number changes.
+    last_of_day = np.append(span.days[1:] != span.days[:-1], True)
+    day_scores = pd.Series(span.moods()[last_of_day]).map(MOOD_SCORES).fillna(0).to_numpy()
+    scores[span.days[last_of_day] - day_number(start_date)] = day_scores
+    return scores
+
+def render_month_calendar(user_history, month_date):
+    first = month_date.replace(day=1)
+    last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+    scores = daily_mood_scores(user_history, first, last)
+
+    cells = [f'<div class="calendar-head">{name}</div>' for name in WEEKDAYS]
+    cells += ['<div class="calendar-day empty"></div>'] * first.weekday()
+    for day, score in enumerate(scores.tolist(), start=1):
+        if score:
+            cells.append(f'<div class="calendar-day mood-{score}"><strong>{day}</strong><br>{MOOD_EMOJIS[score]}</div>')
+        else:
+            cells.append(f'<div class="calendar-day"><strong>{day}</strong></div>')
+
+    # The whole month is one markdown element instead of a 6x7 grid of columns
+    st.markdown(f'''
+        <h3 class="calendar-title">{first.strftime('%B %Y')}</h3>
+        <div class="calendar-grid">{"".join(cells)}</div>
+    ''', unsafe_allow_html=True)
+
+def render_year_calendar(user_history, year):
+    first = datetime.date(year, 1, 1)
+    scores = daily_mood_scores(user_history, first, datetime.date(year, 12, 31))
+
+    # One column per week, Monday on top, like a contribution graph
+    cells = ['<div class="year-cell empty"></div>'] * first.weekday()
+    for offset, score in enumerate(scores.tolist()):
+        day = first + datetime.timedelta(days=offset)
+        cells.append(f'<div class="year-cell mood-{score}" title="{day:%Y-%m-%d}"></div>')
+
+    st.markdown(f'''
+        <h3 class="calendar-title">{year}</h3>
+        <div class="year-grid">{"".join(cells)}</div>
+    ''', unsafe_allow_html=True)
 
 # --- Main Page Logic ---
 st.title("📊 Wellness Dashboard")
@@ -198,36 +261,36 @@ if "username" not in st.session_state or not st.session_state.username:
     st.stop()
 
 username = st.session_state.username
-all_logs_df = load_data()
-user_logs_df = pd.DataFrame()
-if not all_logs_df.empty:
-    user_logs_df = all_logs_df[all_logs_df["username"] == username]
+user_history = load_user_history(username)
 
-if user_logs_df.empty:
+if user_history.empty:
     st.info("Your dashboard is waiting! Log your mood in the 'Mood Tracker' to see your trends.")
     st.stop()
 
 # --- Process Data ---
-user_logs_df['Date'] = pd.to_datetime(user_logs_df['date']).dt.date  # ✅ Fix here (date only)
-mood_mapping = {"Happy": 5, "Neutral": 3, "Anxious": 2, "Sad": 1, "Angry": 1}
-user_logs_df['Mood_Score'] = user_logs_df['mood'].map(mood_mapping).fillna(3)
+# Dates come pre-parsed from the compact history, so no to_datetime on every rerun
+user_logs_df = user_history.to_frame(with_notes=False)
+mood_mapping = MOOD_SCORES
+user_logs_df['Mood_Score'] = user_logs_df['mood'].map(mood_mapping).fillna(DEFAULT_SCORE)
+user_stats = load_user_aggregate(username)
 
 # --- Tabbed Layout ---
-tab1, tab2 = st.tabs(["📈 Weekly Summary", "📅 Monthly Calendar"])
+tab1, tab2, tab3 = st.tabs(["📈 Weekly Summary", "📅 Mood Calendar", "🔭 Long-Range Trends"])
 
 with tab1:
     today = pd.to_datetime(datetime.date.today()).date()
     seven_days_ago = today - datetime.timedelta(days=6)
-    df_week = user_logs_df[user_logs_df['Date'] >= seven_days_ago].copy()
+    df_week = user_logs_df[(user_logs_df['Date'] >= seven_days_ago) & (user_logs_df['Date'] <= today)].copy()
     
     if not df_week.empty:
         df_week.sort_values(by="Date", inplace=True)
         
         st.markdown("### **Your Week at a Glance**")
+        week_stats = user_stats.window(today, 7)
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            avg_mood = df_week['Mood_Score'].mean()
+            avg_mood = week_stats["average"]
             st.markdown(f'''
                 <div class="metric-card">
                     <h3>Average Mood</h3>
@@ -236,7 +299,7 @@ with tab1:
             ''', unsafe_allow_html=True)
         
         with col2:
-            entries_count = len(df_week)
+            entries_count = week_stats["entries"]
             st.markdown(f'''
                 <div class="metric-card">
                     <h3>Entries This Week</h3>
@@ -245,7 +308,7 @@ with tab1:
             ''', unsafe_allow_html=True)
         
         with col3:
-            dominant_mood = df_week['mood'].mode()[0] if not df_week['mood'].mode().empty else "No data"
+            dominant_mood = week_stats["dominant_mood"] or "No data"
             st.markdown(f'''
                 <div class="metric-card">
                     <h3>Most Common Mood</h3>
@@ -256,22 +319,9 @@ with tab1:
         st.markdown("---")
         
         st.markdown("### **Your 7-Day Mood Trend**")
-        if len(df_week) > 1:
-            fig, ax = plt.subplots(figsize=(10, 4))
-            ax.plot(df_week["Date"], df_week["Mood_Score"], marker='o', linestyle='-', color='#667eea', linewidth=2)
-            ax.set_ylim(0, 6)
-            ax.set_yticks([1, 2, 3, 4, 5])
-            ax.set_yticklabels(["😢 Sad", "😟 Anxious", "😐 Neutral", "😊 Good", "😄 Happy"])
-            ax.grid(True, alpha=0.3)
-            ax.set_title("Your Mood Over the Past Week")
-
-            # ✅ Date-only formatting
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            fig.autofmt_xdate()
-
-            plt.tight_layout()
-            st.pyplot(fig)
-            plt.close(fig)
+        trend_png = mood_trend_png(df_week) if len(df_week) > 1 else None
+        if trend_png:
+            st.image(trend_png, use_column_width=True)
         else:
             st.info("Not enough data to show a trend chart. Log more moods to see your pattern!")
         
@@ -288,7 +338,7 @@ with tab1:
         with col_right:
             st.markdown("### **Download Report**")
             if st.button("📥 Generate PDF Report", use_container_width=True):
-                pdf_buffer = generate_pdf_report(checked_goals, df_week, username)
+                pdf_buffer = generate_pdf_report(checked_goals, trend_png, username)
                 st.download_button(
                     label="Download Full Report (PDF)",
                     data=pdf_buffer,
@@ -298,26 +348,36 @@ with tab1:
                 )
 
 with tab2:
-    st.markdown("### **Your Monthly Mood Calendar**")
-    
-    current_date = datetime.date.today()
+    st.markdown("### **Your Mood Calendar**")
+
+    if 'calendar_date' not in st.session_state:
+        st.session_state.calendar_date = datetime.date.today()
+    calendar_date = st.session_state.calendar_date
+
+    calendar_view = st.radio("View", ["Month", "Year"], horizontal=True, key="calendar_view")
     col1, col2, col3 = st.columns([1, 2, 1])
-    
+
     with col1:
-        if st.button("← Previous Month"):
-            st.session_state.calendar_date = current_date - datetime.timedelta(days=current_date.day)
+        if st.button(f"← Previous {calendar_view}"):
+            if calendar_view == "Year":
+                st.session_state.calendar_date = calendar_date.replace(year=calendar_date.year - 1, day=1)
+            else:
+                st.session_state.calendar_date = (calendar_date.replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
             st.rerun()
-    
+
     with col3:
-        if st.button("Next Month →"):
-            next_month = current_date.replace(day=28) + datetime.timedelta(days=4)
-            st.session_state.calendar_date = next_month.replace(day=1)
+        if st.button(f"Next {calendar_view} →"):
+            if calendar_view == "Year":
+                st.session_state.calendar_date = calendar_date.replace(year=calendar_date.year + 1, day=1)
+            else:
+                next_month = calendar_date.replace(day=28) + datetime.timedelta(days=4)
+                st.session_state.calendar_date = next_month.replace(day=1)
             st.rerun()
-    
-    if 'calendar_date' not in st.session_state:
-        st.session_state.calendar_date = current_date
-    
-    create_monthly_calendar(user_logs_df, st.session_state.calendar_date)
+
+    if calendar_view == "Year":
+        render_year_calendar(user_history, calendar_date.year)
+    else:
+        render_month_calendar(user_history, calendar_date)
     
     st.markdown("---")
     st.markdown("**Mood Legend:**")
@@ -334,3 +394,56 @@ with tab2:
         with legend_cols[i]:
             st.markdown(f'<div style="background-color: {color}; padding: 0.5rem; border-radius: 0.5rem; text-align: center; color: white;">{label}</div>', 
                        unsafe_allow_html=True)
+
+with tab3:
+    st.markdown("### **Your Long-Range Trends**")
+    period_days = st.radio("Period", [30, 90, 365], horizontal=True, format_func=lambda d: f"{d} days", key="trend_period")
+    summary = long_range_summary(user_logs_df, datetime.date.today(), period_days)
+
+    if not summary["entries"]:
+        st.info(f"No moods logged in the last {period_days} days.")
+    else:
+        cards = [
+            ("Average Mood", f"{summary['average']:.1f}/5"),
+            ("Days Logged", f"{summary['days_logged']}/{period_days}"),
+            ("Current Streak", f"{summary['current_streak']} days"),
+            ("Longest Streak", f"{summary['longest_streak']} days"),
+        ]
+        for col, (label, value) in zip(st.columns(len(cards)), cards):
+            with col:
+                st.markdown(f'''
+                    <div class="metric-card">
+                        <h3>{label}</h3>
+                        <p>{value}</p>
+                    </div>
+                ''', unsafe_allow_html=True)
+        st.caption(f"Longest run of good days (average 4+): {summary['longest_good_streak']} days. Streaks count your whole history.")
+
+        st.markdown(f"### **Mood Over the Last {period_days} Days**")
+        st.image(long_range_trend_png(summary), use_column_width=True)
+
+        col_left, col_right = st.columns(2)
+
+        with col_left:
+            st.markdown("### **By Day of Week**")
+            weekday = summary["weekday"]
+            fig = go.Figure(go.Bar(
+                x=weekday.index, y=weekday["mean"], marker_color="#667eea",
+                customdata=weekday["count"], hovertemplate="%{x}: %{y:.1f}/5 over %{customdata} entries<extra></extra>",
+            ))
+            fig.update_layout(yaxis_range=[0, 5.5], height=320, margin=dict(l=10, r=10, t=10, b=10))
+            st.plotly_chart(fig, use_container_width=True)
+
+        with col_right:
+            st.markdown("### **What Comes Next**")
+            transitions = summary["transitions"]
+            if transitions.empty:
+                st.info("Log a few more moods to see how they follow each other.")
+            else:
+                fig = go.Figure(go.Heatmap(
+                    z=transitions.to_numpy(), x=transitions.columns, y=transitions.index,
+                    colorscale="Purples", zmin=0, zmax=1, text=((transitions * 100).round().astype(int).astype(str) + "%").to_numpy(),
+                    texttemplate="%{text}", hovertemplate="%{y} → %{x}: %{text}<extra></extra>",
+                ))
+                fig.update_layout(height=320, margin=dict(l=10, r=10, t=10, b=10), xaxis_title="Next mood", yaxis_title="Mood")
+                st.plotly_chart(fig, use_container_width=True)
@@ -1,12 +1,7 @@
 import streamlit as st
-import pandas as pd
-import os
 import datetime
 import random
-
-# --- File Paths and Constants ---
-DATA_FILE = "mood_logs.csv"
-ROUTINE_FILE = "routines.csv"
+from utils.data_store import get_latest_mood, load_today_routine, save_routine
 
 # --- Custom CSS for Styling ---
 def add_custom_css():
@@ -25,15 +20,6 @@ def add_custom_css():
         </style>
     """, unsafe_allow_html=True)
 
-# --- Data Connection Logic ---
-def load_data():
-    if os.path.exists(DATA_FILE):
-        try:
-            return pd.read_csv(DATA_FILE)
-        except pd.errors.EmptyDataError:
-            return pd.DataFrame(columns=["date", "mood", "note", "username"])
-    return pd.DataFrame(columns=["date", "mood", "note", "username"])
-
 # --- Helper Functions ---
 def generate_wellness_tips(mood):
     tips_database = {
@@ -47,35 +33,6 @@ def generate_wellness_tips(mood):
     mood_tips = tips_database.get(mood, tips_database.get("Calm"))
     return random.sample(mood_tips, min(2, len(mood_tips)))
 
-def save_routine(date, activities, username):
-    df_new = pd.DataFrame({
-        "date": [date] * len(activities),
-        "activity": activities,
-        "username": [username] * len(activities)
-    })
-    
-    if os.path.exists(ROUTINE_FILE):
-        try:
-            df_existing = pd.read_csv(ROUTINE_FILE)
-            df_existing = df_existing[~((df_existing["username"] == username) & (df_existing["date"] == date))]
-            df_final = pd.concat([df_existing, df_new], ignore_index=True)
-        except pd.errors.EmptyDataError:
-            df_final = df_new
-    else:
-        df_final = df_new
-    df_final.to_csv(ROUTINE_FILE, index=False)
-
-def load_today_routine(date, username):
-    if os.path.exists(ROUTINE_FILE):
-        try:
-            df = pd.read_csv(ROUTINE_FILE)
-            if "username" in df.columns and "date" in df.columns:
-                user_routine = df[(df["username"] == username) & (df["date"] == date)]
-                return user_routine["activity"].tolist()
-        except pd.errors.EmptyDataError:
-            return []
-    return []
-
 # --- UI Builder ---
 def build_routine_ui(date, username):
     st.header("🗓️ Build Your Daily Wellness Routine")
@@ -104,7 +61,7 @@ def build_routine_ui(date, username):
     if completed_activities:
         if st.button("Clear Completed Activities", use_container_width=True):
             activities_to_keep = [activity for activity, is_done in st.session_state.activity_states.items() if not is_done]
-            save_routine(date, activities_to_keep, username)
+            save_routine(date, activities_to_keep, username).result()
             # Clear the state to force a reload from the updated file
             del st.session_state.activity_states 
             st.rerun()
@@ -114,7 +71,7 @@ def build_routine_ui(date, username):
         if st.form_submit_button("➕ Add Activity"):
             if new_activity.strip() and new_activity.strip() not in today_routine:
                 updated_routine = today_routine + [new_activity.strip()]
-                save_routine(date, updated_routine, username)
+                save_routine(date, updated_routine, username).result()
                 # Clear state to ensure the new item is loaded correctly
                 if 'activity_states' in st.session_state:
                     del st.session_state.activity_states
@@ -131,15 +88,7 @@ if "username" not in st.session_state or not st.session_state.username:
     st.stop()
 
 username = st.session_state.username
-all_logs_df = load_data()
-user_logs_df = pd.DataFrame()
-if not all_logs_df.empty:
-    user_logs_df = all_logs_df[all_logs_df["username"] == username]
-
-latest_mood = None
-if not user_logs_df.empty:
-    user_logs_df['date'] = pd.to_datetime(user_logs_df['date'])
-    latest_mood = user_logs_df.sort_values(by="date", ascending=True).iloc[-1].get("mood")
+latest_mood = get_latest_mood(username)
 
 if latest_mood is None:
     st.info("Log your mood in the 'Mood Tracker' page to get personalized tips!")
@@ -1,27 +1,16 @@
 import streamlit as st
-import pandas as pd
-import os
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 from youtube_search import YoutubeSearch
 import random
+from utils.data_store import get_latest_mood
 
 # --- Setup ---
 load_dotenv()
-DATA_FILE = "mood_logs.csv"
 if 'llm' not in st.session_state:
     st.session_state.llm = ChatGroq(temperature=0.7, model_name="llama-3.1-8b-instant")
 
-# --- Data Connection Logic ---
-def load_data():
-    if os.path.exists(DATA_FILE):
-        try:
-            return pd.read_csv(DATA_FILE)
-        except pd.errors.EmptyDataError:
-            return pd.DataFrame()
-    return pd.DataFrame()
-
 # --- Custom CSS for Enhanced UI ---
 st.markdown("""
     <style>
@@ -138,15 +127,7 @@ if "username" not in st.session_state or not st.session_state.username:
     st.stop()
 
 username = st.session_state.username
-all_logs_df = load_data()
-user_logs_df = pd.DataFrame()
-if not all_logs_df.empty:
-    user_logs_df = all_logs_df[all_logs_df["username"] == username]
-
-latest_mood = None
-if not user_logs_df.empty:
-    user_logs_df['date'] = pd.to_datetime(user_logs_df['date'])
-    latest_mood = user_logs_df.sort_values(by="date", ascending=False).iloc[0].get("mood")
+latest_mood = get_latest_mood(username)
 
 if latest_mood is None:
     st.info("Log your mood in the 'Mood Tracker' page to get personalized music suggestions!")
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from utils.analytics import long_range_summary, streaks
+
+
+def test_current_streak_may_end_yesterday():
+    assert streaks(np.array([True, True, False, True, True, True, False])) == (3, 3)
+    assert streaks(np.array([True, True, True, False, False])) == (3, 0)
+    assert streaks(np.array([False, True, True])) == (2, 2)
+    assert streaks(np.array([], dtype=bool)) == (0, 0)
+
+
+def test_long_range_summary_of_the_window():
+    frame = pd.DataFrame({
+        "Date": pd.to_datetime(["2025-08-01", "2025-09-10", "2025-09-11", "2025-09-11", "2025-09-13", "2025-09-14"]),
+        "mood": ["Sad", "Happy", "Happy", "Sad", "Happy", "Neutral"],
+        "Mood_Score": [1, 5, 5, 1, 5, 3],
+    })
+
+    summary = long_range_summary(frame, pd.Timestamp("2025-09-14"), 7)
+
+    assert summary["entries"] == 5
+    assert summary["average"] == 19 / 5
+    assert summary["days_logged"] == 4
+    assert summary["daily"].index[0] == pd.Timestamp("2025-09-08")
+    assert summary["daily"].loc["2025-09-11"] == 3
+    assert np.isnan(summary["daily"].loc["2025-09-12"])
+    assert (summary["longest_streak"], summary["current_streak"]) == (2, 2)
+    assert summary["longest_good_streak"] == 1
+    assert summary["weekday"].loc["Thu", "count"] == 2
+    assert summary["transitions"].loc["Happy", "Sad"] == 1 / 3
+    assert summary["transitions"].loc["Sad", "Happy"] == 1
+
+
+def test_long_range_summary_with_nothing_logged():
+    frame = pd.DataFrame({"Date": pd.to_datetime([]), "mood": [], "Mood_Score": []})
+
+    summary = long_range_summary(frame, pd.Timestamp("2025-09-14"), 30)
+
+    assert summary["entries"] == 0 and summary["average"] is None
+    assert summary["current_streak"] == 0
+    assert summary["daily"].empty
@@ -0,0 +1,203 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from utils import data_store
+
+
+def test_full_read_leaves_half_written_row_for_next_read(tmp_path):
+    path = str(tmp_path / "mood_logs.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("date,mood,note,username\n2025-09-14,Happy,,a\n2025-09-15,Sa")
+
+    logs = data_store.read_csv_logs(path)
+    assert logs["mood"].tolist() == ["Happy"]
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("d,,a\n2025-09-16,Happy,,b\n")
+
+    logs = data_store.read_csv_logs(path)
+    assert logs["date"].tolist() == ["2025-09-14", "2025-09-15", "2025-09-16"]
+    assert logs["mood"].tolist() == ["Happy", "Sad", "Happy"]
+    assert logs["username"].tolist() == ["a", "a", "b"]
+    aggregate = data_store._entry_aggregate(data_store._cache[path], "a")
+    assert aggregate.mood_counts == {"Happy": 1, "Sad": 1}
+
+
+def test_writes_only_rebuild_their_own_users_columns(tmp_path):
+    path = str(tmp_path / "mood_logs.csv")
+    data_store._append_rows([
+        {"date": "2025-09-14", "mood": "Happy", "note": "", "username": "a"},
+        {"date": "2025-09-14", "mood": "Sad", "note": "", "username": "b"},
+    ], path)
+
+    def history():
+        return data_store._load_entry(path)["history"]
+
+    first = history().users["a"]
+    data_store._append_rows([{"date": "2025-09-15", "mood": "Angry", "note": "", "username": "b"}], path)
+    assert history().users["a"] is first
+
+    data_store._append_rows([{"date": "2025-09-15", "mood": "Sad", "note": "rainy", "username": "a"}], path)
+    assert history().users["a"] is not first
+    assert history().user("a").moods().tolist() == ["Happy", "Sad"]
+    assert history().user("a").notes().tolist() == ["", "rainy"]
+
+    b_columns = history().users["b"]
+    data_store._append_rows([{"date": "2025-09-15", "mood": data_store.TOMBSTONE_MOOD, "note": "", "username": "a"}], path)
+    assert history().user("a").moods().tolist() == ["Happy"]
+    assert history().users["b"] is b_columns
+
+
+def test_rows_appended_to_an_empty_file_keep_their_header(tmp_path):
+    path = str(tmp_path / "mood_logs.csv")
+    open(path, "w").close()
+    assert data_store.read_csv_logs(path).empty
+
+    data_store._append_rows([{"date": "2025-09-14", "mood": "Happy", "note": "", "username": "a"}], path)
+
+    logs = data_store.read_csv_logs(path)
+    assert logs[["date", "mood", "username"]].to_dict("records") == [
+        {"date": "2025-09-14", "mood": "Happy", "username": "a"}
+    ]
+
+
+def test_numeric_looking_values_stay_text(tmp_path):
+    path = str(tmp_path / "mood_logs.csv")
+    data_store._append_rows([{"date": "2025-09-14", "mood": "Happy", "note": "NA", "username": "123"}], path)
+    data_store.read_csv_logs(path)
+
+    data_store._append_rows([{"date": "2025-09-15", "mood": "Sad", "note": "", "username": "123"}], path)
+
+    logs = data_store.read_csv_logs(path)
+    assert logs["username"].tolist() == ["123", "123"]
+    assert logs["note"].tolist() == ["NA", ""]
+    entry = data_store._cache[path]
+    assert len(entry["history"].user("123")) == 2
+    assert data_store._entry_aggregate(entry, "123").logged_on("2025-09-15")
+
+
+def test_multi_line_note_is_not_read_half_written(tmp_path):
+    path = str(tmp_path / "mood_logs.csv")
+    data_store._append_rows([{"date": "2025-09-14", "mood": "Happy", "note": "", "username": "a"}], path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('2025-09-15,Sad,"first line\nsecond')
+
+    assert data_store.read_csv_logs(path)["mood"].tolist() == ["Happy"]
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(' line",a\n')
+    data_store._append_rows([], path)
+
+    logs = data_store.read_csv_logs(path)
+    assert logs["note"].tolist() == ["", "first line\nsecond line"]
+
+
+def _rows(username, dates):
+    return [{"date": date, "mood": "Happy", "note": "", "username": username} for date in dates]
+
+
+def test_snapshot_compaction_interrupted_before_emptying_the_delta(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    path, snapshot_path = str(tmp_path / "mood_logs.csv"), str(tmp_path / "mood_logs.parquet")
+    data_store._append_rows(_rows("a", ["2025-09-14", "2025-09-15"]), path)
+    data_store._append_rows([{"date": "2025-09-14", "mood": data_store.TOMBSTONE_MOOD, "note": "", "username": "a"}], path)
+
+    def crash(*args):
+        raise OSError("crashed before the delta was replaced")
+
+    monkeypatch.setattr(data_store, "_replace_file", crash)
+    with pytest.raises(OSError):
+        data_store.compact_snapshot(path, snapshot_path)
+    monkeypatch.undo()
+    data_store._append_rows(_rows("a", ["2025-09-16"]), path)
+
+    data_store.invalidate_cache(path)
+    dates = ["2025-09-15", "2025-09-16"]
+    assert data_store._load_entry(path, snapshot_path)["history"].user("a").to_frame()["date"].tolist() == dates
+    assert data_store.compact_snapshot(path, snapshot_path) == 2
+    data_store.invalidate_cache(path)
+    assert data_store._load_entry(path, snapshot_path)["history"].user("a").to_frame()["date"].tolist() == dates
+
+
+def test_writer_compacts_in_the_background(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = data_store.DATA_FILE
+    monkeypatch.setattr(data_store, "STORAGE_BACKEND", "csv")
+    monkeypatch.setattr(data_store, "COMPACT_THRESHOLD", 2)
+    data_store._flush_writes([("log", (row,)) for row in _rows("a", ["2025-09-14", "2025-09-15"])])
+    data_store._load_entry(path)
+
+    data_store._flush_writes([("clear", ("a", "2025-09-14")), ("clear", ("a", "2025-09-15"))])
+    assert not data_store._compaction_lock.locked()
+    data_store._load_entry(path)
+    data_store._flush_writes([("log", (row,)) for row in _rows("a", ["2025-09-16"])])
+    for thread in threading.enumerate():
+        if thread.name == "mindmate-compaction":
+            thread.join()
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "date,mood,note,username\n2025-09-16,Happy,,a\n"
+    entry = data_store._load_entry(path)
+    assert entry["tombstones"] == 0
+    assert entry["history"].user("a").to_frame()["date"].tolist() == ["2025-09-16"]
+
+
+def test_sqlite_user_is_rebuilt_only_when_their_rows_change(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_store, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(data_store, "_sqlite_ready", False)
+    monkeypatch.setattr(data_store, "_sqlite_users", data_store.OrderedDict())
+    loads = []
+    load_user_logs = data_store.sqlite_store.load_user_logs
+    monkeypatch.setattr(data_store.sqlite_store, "load_user_logs", lambda username: loads.append(username) or load_user_logs(username))
+    data_store._flush_writes([("log", (row,)) for row in _rows("a", ["2025-09-14", "2025-09-15"])])
+
+    assert data_store.load_user_aggregate("a").entry_count == 2
+    assert len(data_store.load_user_history("a")) == 2
+    version = data_store.get_user_data_version("a")
+    assert loads == ["a"]
+
+    data_store._flush_writes([("clear", ("a", "2025-09-15"))])
+    assert data_store.load_user_aggregate("a").last_date == "2025-09-14"
+    assert data_store.load_user_history("a").moods().tolist() == ["Happy"]
+    assert data_store.get_user_data_version("a") != version
+    assert loads == ["a", "a"]
+
+
+def test_tombstone_clears_only_earlier_entries_of_its_user_and_day():
+    logs = pd.DataFrame([
+        ("2025-09-14", "Happy", "a"),
+        ("2025-09-14", "Sad", "b"),
+        ("2025-09-15", "Angry", "a"),
+        ("2025-09-14", data_store.TOMBSTONE_MOOD, "a"),
+        ("2025-09-14", "Neutral", "a"),
+    ], columns=["date", "mood", "username"])
+
+    kept = data_store.apply_tombstones(logs)
+
+    assert kept.values.tolist() == [
+        ["2025-09-14", "Sad", "b"],
+        ["2025-09-15", "Angry", "a"],
+        ["2025-09-14", "Neutral", "a"],
+    ]
+    assert data_store.apply_tombstones(kept) is kept
+
+
+def test_compact_logs_folds_tombstones_into_the_file(tmp_path):
+    path = str(tmp_path / "mood_logs.csv")
+    data_store._append_rows([
+        {"date": "2025-09-14", "mood": "Happy", "note": "first, with a comma", "username": "a"},
+        {"date": "2025-09-15", "mood": "Sad", "note": "", "username": "a"},
+        {"date": "2025-09-15", "mood": data_store.TOMBSTONE_MOOD, "note": "", "username": "a"},
+    ], path)
+    before = data_store.read_csv_logs(path)
+
+    assert data_store.compact_logs(path) == 1
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == 'date,mood,note,username\n2025-09-14,Happy,"first, with a comma",a\n'
+    assert data_store._cache[path]["tombstones"] == 0
+    pd.testing.assert_frame_equal(data_store.read_csv_logs(path), before)
+    data_store.invalidate_cache(path)
+    pd.testing.assert_frame_equal(data_store.read_csv_logs(path), before)
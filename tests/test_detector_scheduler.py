@@ -0,0 +1,48 @@
+from utils.detector_scheduler import DetectorScheduler
+
+
+def test_attempts_reported_by_a_worker_feed_the_servers_stats():
+    scheduler = DetectorScheduler(["opencv", "ssd"])
+    scheduler.record_attempts([
+        ("opencv", 0.3, "Face could not be detected"),
+        ("ssd", 0.1, None),
+        ("emotion model", 0.0, "failed to load"),
+    ])
+
+    stats = scheduler.stats()
+    assert stats["opencv"]["attempts"] == 1 and stats["opencv"]["success_rate"] == 1 / 3
+    assert stats["ssd"]["attempts"] == 1 and stats["ssd"]["success_rate"] == 2 / 3
+    assert "emotion model" not in stats
+
+
+def test_order_starts_with_the_prior_latencies():
+    assert DetectorScheduler(["retinaface", "opencv", "mtcnn", "ssd"]).order() == ["opencv", "ssd", "mtcnn", "retinaface"]
+
+
+def test_faster_measured_backend_moves_ahead():
+    scheduler = DetectorScheduler(["opencv", "ssd"])
+    for _ in range(10):
+        scheduler.record("opencv", True, 1.0)
+        scheduler.record("ssd", True, 0.05)
+
+    assert scheduler.order() == ["ssd", "opencv"]
+
+
+def test_unreliable_backend_goes_last_however_fast():
+    scheduler = DetectorScheduler(["opencv", "retinaface"])
+    for _ in range(3):
+        scheduler.record("opencv", False, 0.01)
+    scheduler.record("retinaface", True, 2.0)
+
+    assert scheduler.order() == ["retinaface", "opencv"]
+
+
+def test_benched_backend_comes_back_once_it_succeeds_again():
+    scheduler = DetectorScheduler(["opencv", "retinaface"])
+    scheduler.record("opencv", False, 0.1)
+    scheduler.record("retinaface", True, 2.0)
+    assert scheduler.order() == ["retinaface", "opencv"]
+
+    for _ in range(3):
+        scheduler.record("opencv", True, 0.1)
+    assert scheduler.order() == ["opencv", "retinaface"]
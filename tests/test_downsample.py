@@ -0,0 +1,29 @@
+import numpy as np
+
+from utils.downsample import lttb
+
+
+def test_short_series_come_back_whole():
+    assert lttb(np.arange(5), np.arange(5), max_points=5).tolist() == [0, 1, 2, 3, 4]
+    assert lttb(np.arange(5), np.arange(5), max_points=2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_keeps_both_endpoints_and_one_point_per_bucket():
+    x = np.arange(1000)
+    y = np.sin(x / 30.0)
+
+    keep = lttb(x, y, max_points=50)
+
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    # One pick inside each of the 48 interior buckets, in order.
+    edges = np.linspace(1, 999, 49).astype(np.int64)
+    assert all(lo <= i < hi for i, lo, hi in zip(keep[1:-1], edges[:-1], edges[1:]))
+
+
+def test_an_isolated_spike_survives():
+    x = np.arange(200)
+    y = np.zeros(200)
+    y[137] = 10
+
+    assert 137 in lttb(x, y, max_points=20)
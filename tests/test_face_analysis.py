@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("deepface")
+
+from utils.face_analysis import combine_predictions  # noqa: E402
+
+
+def test_confident_frames_outweigh_unsure_ones():
+    probabilities = np.array([
+        [0.9, 0.1],
+        [0.4, 0.6],
+    ])
+
+    combined = combine_predictions(probabilities)
+
+    expected = (0.9 * probabilities[0] + 0.6 * probabilities[1]) / 1.5
+    np.testing.assert_allclose(combined, expected)
+    assert combined.sum() == pytest.approx(1)
+    assert combined.argmax() == 0
+
+
+def test_a_single_frame_is_returned_as_is():
+    probabilities = np.array([[0.2, 0.5, 0.3]])
+
+    np.testing.assert_allclose(combine_predictions(probabilities), probabilities[0])
@@ -0,0 +1,63 @@
+import datetime
+
+import pandas as pd
+
+from utils.mood_stats import AggregateTable, UserAggregate
+
+
+def test_clear_day_takes_the_days_entries_back_out():
+    user = UserAggregate()
+    user.add("2025-09-14", "Happy")
+    user.add("2025-09-15", "Sad")
+    user.add("2025-09-15", "Happy")
+    version = user.data_version
+
+    user.clear_day("2025-09-15")
+
+    assert user.mood_counts == {"Happy": 1}
+    assert user.entry_count == 1 and user.score_sum == 5
+    assert not user.logged_on("2025-09-15")
+    assert (user.last_date, user.last_mood) == ("2025-09-14", "Happy")
+    assert user.data_version != version
+
+    user.clear_day("2025-09-20")
+    assert user.entry_count == 1
+
+
+def test_window_covers_the_days_ending_at_end_date():
+    user = UserAggregate()
+    for date, mood in [("2025-09-07", "Sad"), ("2025-09-08", "Happy"), ("2025-09-14", "Anxious"), ("2025-09-14", "Happy")]:
+        user.add(date, mood)
+
+    week = user.window(datetime.date(2025, 9, 14), 7)
+
+    assert week["entries"] == 3
+    assert week["average"] == (5 + 2 + 5) / 3
+    assert week["dominant_mood"] == "Happy"
+    assert user.window(datetime.date(2025, 9, 30), 7) == {"entries": 0, "average": None, "dominant_mood": None}
+
+
+def test_dominant_mood_breaks_ties_like_series_mode():
+    moods = ["Sad", "Happy", "Angry", "Happy", "Sad"]
+    user = UserAggregate()
+    for mood in moods:
+        user.add("2025-09-14", mood)
+
+    dominant = user.window(datetime.date(2025, 9, 14), 1)["dominant_mood"]
+
+    assert dominant == pd.Series(moods).mode()[0] == "Happy"
+
+
+def test_table_applies_tombstones_in_file_order():
+    rows = pd.DataFrame([
+        ("2025-09-14", "Happy", "a"),
+        ("2025-09-14", "__cleared__", "a"),
+        ("2025-09-14", "Sad", "a"),
+        ("2025-09-14", "Angry", "b"),
+    ], columns=["date", "mood", "username"])
+
+    table = AggregateTable().apply_frame(rows, "__cleared__")
+
+    assert table.get("a").mood_counts == {"Sad": 1}
+    assert table.get("b").last_mood == "Angry"
+    assert table.get("nobody").entry_count == 0
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from utils.write_queue import WriteBehindQueue
+
+
+def test_one_failing_mutation_only_fails_its_own_future():
+    release = threading.Event()
+    applied, batches = [], []
+
+    def flush(mutations):
+        release.wait()
+        batches.append(len(mutations))
+        if ("log", ("bad",)) in mutations:
+            raise ValueError("bad row")
+        applied.extend(args[0] for _, args in mutations)
+
+    queue = WriteBehindQueue(flush, max_delay=0.5)
+    futures = [queue.submit("log", name) for name in ["a", "bad", "b"]]
+    release.set()
+
+    assert futures[0].result(timeout=5) and futures[2].result(timeout=5)
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+    assert applied == ["a", "b"]
+    assert batches == [3, 1, 1, 1]
+
+
+def test_writes_queued_during_a_flush_go_out_together_in_order():
+    started, release = threading.Event(), threading.Event()
+    batches = []
+
+    def flush(mutations):
+        batches.append([args[0] for _, args in mutations])
+        started.set()
+        release.wait()
+
+    queue = WriteBehindQueue(flush, max_batch=3, max_delay=0)
+    first = queue.submit("log", 0)
+    started.wait(timeout=5)
+    futures = [queue.submit("log", n) for n in range(1, 6)]
+    assert not first.done() and not any(f.done() for f in futures)
+    release.set()
+
+    assert [f.result(timeout=5) for f in [first] + futures] == [True] * 6
+    assert batches == [[0], [1, 2, 3], [4, 5]]
+
+
+def test_failed_flush_of_a_single_write_fails_its_future():
+    queue = WriteBehindQueue(lambda mutations: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        queue.submit("log", "a").result(timeout=5)
@@ -0,0 +1,89 @@
+# utils/analytics.py
+import numpy as np
+import pandas as pd
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+GOOD_DAY_SCORE = 4
+ROLLING_WINDOW = 7
+
+
+def daily_scores(dates, scores, end_date):
+    """Mean score per calendar day from the first entry up to end_date; NaN on days nothing was logged."""
+    valid = dates.notna().to_numpy() & (dates <= end_date).to_numpy()
+    daily = scores[valid].groupby(dates[valid].to_numpy()).mean()
+    if daily.empty:
+        return pd.Series(index=pd.DatetimeIndex([]), dtype=float)
+    return daily.reindex(pd.date_range(daily.index.min(), end_date, freq="D"))
+
+
+def run_lengths(mask):
+    """Lengths of the runs of True in a boolean array, in order."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[1::2] - edges[::2]
+
+
+def streaks(mask):
+    """
+    (longest, current) run of True days. The current run may end yesterday,
+    so a streak isn't reported as broken before today's entry is in.
+    """
+    runs = run_lengths(mask)
+    if not len(runs):
+        return 0, 0
+    current = runs[-1] if mask[-1] or (len(mask) > 1 and mask[-2]) else 0
+    return int(runs.max()), int(current)
+
+
+def weekday_profile(dates, scores):
+    """Average score and entry count per weekday, Monday first."""
+    profile = scores.groupby(dates.dt.dayofweek.to_numpy()).agg(["mean", "count"])
+    profile = profile.reindex(range(7))
+    profile["count"] = profile["count"].fillna(0).astype(int)
+    profile.index = WEEKDAYS
+    return profile
+
+
+def transition_matrix(moods):
+    """Share of entries followed by each mood (rows: from, columns: to), in entry order."""
+    moods = moods.dropna().to_numpy()
+    if len(moods) < 2:
+        return pd.DataFrame()
+    return pd.crosstab(pd.Series(moods[:-1], name="from"), pd.Series(moods[1:], name="to"), normalize="index")
+
+
+def long_range_summary(frame, end_date, days):
+    """
+    Trends over the `days` days ending at end_date, from the dashboard frame
+    (needs `Date`, `mood` and `Mood_Score`). Streaks look at the whole history.
+    """
+    end = pd.Timestamp(end_date)
+    start = end - pd.Timedelta(days=days - 1)
+    dates = pd.to_datetime(frame["Date"], errors="coerce")
+    scores = frame["Mood_Score"].astype(float)
+
+    daily = daily_scores(dates, scores, end)
+    # Rolling over the full series so the first days of the window still see the week before.
+    rolling = daily.rolling(ROLLING_WINDOW, min_periods=1).mean()
+    logged = daily.notna().to_numpy()
+    longest_streak, current_streak = streaks(logged)
+    longest_good_streak, _ = streaks((daily >= GOOD_DAY_SCORE).to_numpy())
+
+    in_window = ((dates >= start) & (dates <= end)).to_numpy()
+    window_dates, window_scores = dates[in_window], scores[in_window]
+    # Entries are date-sorted, so the slice keeps the order transitions need.
+    window_moods = frame["mood"][in_window]
+    window_days = daily.index >= start
+
+    return {
+        "daily": daily[window_days],
+        "rolling": rolling[window_days],
+        "entries": int(in_window.sum()),
+        "average": float(window_scores.mean()) if in_window.any() else None,
+        "days_logged": int(logged[window_days].sum()),
+        "longest_streak": longest_streak,
+        "current_streak": current_streak,
+        "longest_good_streak": longest_good_streak,
+        "weekday": weekday_profile(window_dates, window_scores),
+        "transitions": transition_matrix(window_moods),
+    }
@@ -0,0 +1,46 @@
+# utils/chart_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+
+MAX_CHARTS = 128
+
+_charts = OrderedDict()
+_cache_lock = threading.Lock()
+# pyplot keeps global state (current figure, rcParams under style.context), so renders take turns.
+_render_lock = threading.Lock()
+
+
+def chart_key(name, data, style, dpi):
+    return hashlib.sha256(repr((name, data, sorted(style.items()), dpi)).encode("utf-8")).hexdigest()
+
+
+def cached_chart(name, data, style, draw, dpi=100):
+    """
+    PNG bytes for a chart, rendered at most once per (name, data, style, dpi).
+    `data` and `style` must have a stable repr (tuples, dicts of plain values);
+    draw(data, style) builds and returns the matplotlib figure.
+    """
+    key = chart_key(name, data, style, dpi)
+    with _cache_lock:
+        png = _charts.get(key)
+        if png is not None:
+            _charts.move_to_end(key)
+            return png
+
+    with _render_lock:
+        with plt.style.context(style.get("theme", "default")):
+            fig = draw(data, style)
+            buffer = BytesIO()
+            fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+        plt.close(fig)
+    png = buffer.getvalue()
+
+    with _cache_lock:
+        _charts[key] = png
+        while len(_charts) > MAX_CHARTS:
+            _charts.popitem(last=False)
+    return png
@@ -0,0 +1,584 @@
+# utils/data_store.py
+import csv
+import io
+import itertools
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils import snapshot_store, sqlite_store, write_queue
+from utils.mood_history import MoodHistory
+from utils.mood_stats import AggregateTable
+
+DATA_FILE = "mood_logs.csv"
+ROUTINE_FILE = "routines.csv"
+LOG_COLUMNS = ["date", "mood", "note", "username"]
+ROUTINE_COLUMNS = ["date", "activity", "username"]
+
+# "csv" (default) keeps the flat files; "sqlite" uses utils/sqlite_store.py and
+# imports the existing CSVs into the database the first time it is opened;
+# "parquet" keeps a typed snapshot (utils/snapshot_store.py) and uses
+# mood_logs.csv only as the append log of writes since the last compaction.
+STORAGE_BACKEND = os.getenv("MINDMATE_STORAGE", "csv").lower()
+
+# A tombstone row clears every earlier entry with the same (username, date).
+TOMBSTONE_MOOD = "__cleared__"
+# Fold tombstones into the file once this many have piled up.
+COMPACT_THRESHOLD = 200
+# In parquet mode, merge the CSV delta into the snapshot once it grows past this.
+DELTA_COMPACT_BYTES = 1 << 20
+
+# Every field is read as text, so a username like "123" or a note like "NA" comes back as
+# written, however much of the file a read covers; only empty date/mood/username fields are missing.
+CSV_READ_OPTIONS = {
+    "dtype": str,
+    "keep_default_na": False,
+    "na_values": {"date": [""], "mood": [""], "username": [""]},
+}
+
+_write_lock = threading.Lock()
+
+
+def _empty_logs():
+    return pd.DataFrame(columns=LOG_COLUMNS)
+
+
+def _read_header(path):
+    """Column order of an existing log file, or None if it is missing/empty."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), None)
+    return header or None
+
+
+# --- Reading ---
+def read_raw_logs(path=DATA_FILE):
+    """All rows as written, tombstones included."""
+    if os.path.exists(path):
+        try:
+            return pd.read_csv(path, **CSV_READ_OPTIONS)
+        except pd.errors.EmptyDataError:
+            return _empty_logs()
+    return _empty_logs()
+
+
+def apply_tombstones(df):
+    """Drop entries cleared by a later tombstone, and the tombstones themselves."""
+    if df.empty or "mood" not in df.columns:
+        return df
+    is_tombstone = (df["mood"] == TOMBSTONE_MOOD).to_numpy()
+    if not is_tombstone.any():
+        return df
+
+    position = pd.Series(np.arange(len(df)), index=df.index)
+    last_tombstone = (
+        position.where(is_tombstone)
+        .groupby([df["username"], df["date"]], dropna=False, observed=True)
+        .transform("max")
+    )
+    keep = ~is_tombstone & (last_tombstone.isna() | (position > last_tombstone)).to_numpy()
+    return df[keep].reset_index(drop=True)
+
+
+# --- Process-wide cache ---
+# One copy of the logs per server process, shared by every session: the CSV
+# alone, or in parquet mode the snapshot plus the CSV delta. Only the compact
+# per-user columns (utils/mood_history.py) are kept; the parsed frames are
+# dropped once folded in, and a user's totals (utils/mood_stats.py) are derived
+# from their columns when first asked for.
+# The entry remembers the inode/size/mtime it was read at, so an unchanged file
+# costs one stat() and appended rows are parsed on their own.
+_cache_lock = threading.Lock()
+_cache = {}
+_versions = itertools.count()
+# path -> (inode, size): how much of the file this process's writer has finished writing.
+_committed = {}
+
+
+def _publish_committed(path):
+    """Record the file's current size as whole rows; call with _write_lock held, after writing."""
+    stat = os.stat(path)
+    _committed[path] = (stat.st_ino, stat.st_size)
+
+
+def _read_complete_rows(path, offset, stat):
+    """
+    Bytes from offset up to the end of the last whole row. Appends made by this
+    process are read only as far as the writer has published, so a quoted
+    multi-line note is never cut in half; otherwise the read stops at the last
+    newline and leaves an unfinished row for the next read to pick up.
+    """
+    committed = _committed.get(path)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        if committed is not None and committed[0] == stat.st_ino:
+            return f.read(max(0, committed[1] - offset))
+        data = f.read()
+    return data[:data.rfind(b"\n") + 1]
+
+
+def _count_tombstones(df):
+    return int((df["mood"] == TOMBSTONE_MOOD).sum()) if "mood" in df.columns else 0
+
+
+def _parse_rows(data, header):
+    """Header-less CSV rows in the log's column order."""
+    if not data.strip():
+        return pd.DataFrame(columns=header)
+    return pd.read_csv(io.BytesIO(data), header=None, names=header, **CSV_READ_OPTIONS)
+
+
+def _delta_start(delta_mark, stat):
+    """Where the unmerged part of the delta starts, given the snapshot's delta mark."""
+    if delta_mark is None or stat is None or delta_mark[0] != stat.st_ino:
+        return 0
+    return min(delta_mark[1], stat.st_size)
+
+
+def _full_read(path, stat, snapshot_path):
+    snapshot, snapshot_stamp, start = None, None, 0
+    if snapshot_path is not None:
+        snapshot, snapshot_stamp, delta_mark = snapshot_store.read_snapshot(snapshot_path)
+        # A compaction that stopped before emptying the delta: skip the rows it merged.
+        start = _delta_start(delta_mark, stat)
+    if start:
+        header = _read_header(path)
+        data = _read_complete_rows(path, start, stat)
+        raw = _parse_rows(data, header)
+    else:
+        data = b"" if stat is None else _read_complete_rows(path, 0, stat)
+        try:
+            raw = pd.read_csv(io.BytesIO(data), **CSV_READ_OPTIONS)
+            header = list(raw.columns)
+        except pd.errors.EmptyDataError:
+            # No complete header line yet: the next read has to start from the top again.
+            raw, header = _empty_logs(), None
+    if snapshot is None:
+        history = MoodHistory(apply_tombstones(raw))
+    else:
+        # The snapshot is compacted already; the delta's tombstones are applied per user.
+        history = MoodHistory(snapshot).add_frame(raw, TOMBSTONE_MOOD)
+    return {
+        "version": next(_versions),
+        "inode": None if stat is None else stat.st_ino,
+        "size": start + len(data),
+        "mtime": None if stat is None else stat.st_mtime_ns,
+        "header": header,
+        "snapshot_stamp": snapshot_stamp,
+        "tombstones": _count_tombstones(raw),
+        "history": history,
+        # username -> (the columns it was built from, UserAggregate)
+        "aggregates": {},
+    }
+
+
+def _read_tail(path, entry, stat):
+    """Fold rows appended since the last read into the entry, in place (under _cache_lock)."""
+    data = _read_complete_rows(path, entry["size"], stat)
+    entry.update(size=entry["size"] + len(data), mtime=stat.st_mtime_ns)
+    if not data.strip():
+        return
+    tail = _parse_rows(data, entry["header"])
+    entry.update(version=next(_versions), tombstones=entry["tombstones"] + _count_tombstones(tail))
+    entry["history"].add_frame(tail, TOMBSTONE_MOOD)
+
+
+def invalidate_cache(path=DATA_FILE):
+    with _cache_lock:
+        _cache.pop(path, None)
+
+
+def _load_entry(path=DATA_FILE, snapshot_path=None):
+    snapshot_stamp = None if snapshot_path is None else snapshot_store.snapshot_stamp(snapshot_path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        stat = None
+
+    with _cache_lock:
+        entry = _cache.get(path)
+        if (
+            entry is None or entry["snapshot_stamp"] != snapshot_stamp
+            or entry["inode"] != (None if stat is None else stat.st_ino)
+        ):
+            entry = _full_read(path, stat, snapshot_path)
+        elif stat is not None and (entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime_ns):
+            if stat.st_size > entry["size"] and entry["header"]:
+                _read_tail(path, entry, stat)
+            else:
+                entry = _full_read(path, stat, snapshot_path)
+        _cache[path] = entry
+    return entry
+
+
+def _current_entry():
+    if STORAGE_BACKEND == "parquet":
+        return _load_entry(DATA_FILE, snapshot_store.SNAPSHOT_FILE)
+    return _load_entry()
+
+
+def _entry_aggregate(entry, username):
+    """A user's totals, rebuilt from their columns only after those have changed."""
+    with _cache_lock:
+        columns = entry["history"].users.get(username)
+        cached = entry["aggregates"].get(username)
+        if cached is None or cached[0] is not columns:
+            rows = entry["history"].user(username).to_frame(with_notes=False)
+            cached = entry["aggregates"][username] = (columns, AggregateTable().apply_frame(rows, TOMBSTONE_MOOD).get(username))
+        return cached[1]
+
+
+def _entry_logs(entry):
+    """Every current entry as a new frame, built from the cached columns."""
+    with _cache_lock:
+        return entry["history"].to_frame()
+
+
+def read_csv_logs(path=DATA_FILE):
+    return _entry_logs(_load_entry(path))
+
+
+def read_csv_routines(path=ROUTINE_FILE):
+    if os.path.exists(path):
+        try:
+            return pd.read_csv(path, dtype=str, keep_default_na=False)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(columns=ROUTINE_COLUMNS)
+    return pd.DataFrame(columns=ROUTINE_COLUMNS)
+
+
+# --- CSV Writing ---
+def _append_rows(rows, path=DATA_FILE):
+    """
+    Append rows (dicts) to the log without reading the existing data. The rows
+    are on disk when this returns; if the write fails, none of them are.
+    """
+    with _write_lock:
+        header = _read_header(path)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if header is None:
+            header = LOG_COLUMNS
+            writer.writerow(header)
+        for row in rows:
+            writer.writerow(["" if row.get(col) is None else row.get(col) for col in header])
+        data = memoryview(buffer.getvalue().encode("utf-8"))
+        with open(path, "ab", buffering=0) as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                while data:
+                    data = data[f.write(data):]
+                os.fsync(f.fileno())
+            except BaseException:
+                f.truncate(start)
+                raise
+        _publish_committed(path)
+
+
+# --- Compaction ---
+# Started by the writer thread on a thread of its own once tombstones pile up
+# (or, in parquet mode, the delta grows). Reading and merging everything
+# written so far happens without _write_lock; the lock is only held to copy
+# over the rows appended meanwhile and swap the new file in. The cache entry is
+# moved over to the new files rather than dropped: the entries are the same.
+_compaction_lock = threading.Lock()
+
+
+def _read_bytes(path, start, stop):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(stop - start)
+
+
+def _replace_file(path, chunks):
+    """Write chunks to a temp file, flush it to disk and move it over path."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _move_cache_entry(path, old_stat, cut, new_start, tail):
+    """
+    The bytes of path from `cut` on now start at `new_start` of a new file
+    (call with _write_lock held, after the replace). Keep the cached entry if it
+    had read at least up to `cut`, otherwise it misses rows: drop it.
+    """
+    stat = os.stat(path)
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is None:
+            return
+        if entry["inode"] != old_stat.st_ino or entry["size"] < cut:
+            del _cache[path]
+            return
+        read = tail[:entry["size"] - cut]
+        entry.update(
+            inode=stat.st_ino,
+            size=new_start + len(read),
+            mtime=stat.st_mtime_ns,
+            tombstones=read.count(TOMBSTONE_MOOD.encode()),
+        )
+
+
+def compact_logs(path=DATA_FILE):
+    """Rewrite the log with tombstones folded in. Returns the number of entries kept."""
+    with _compaction_lock:
+        with _write_lock:
+            header = _read_header(path)
+            if header is None:
+                return 0
+            stat = os.stat(path)
+        df = apply_tombstones(pd.read_csv(io.BytesIO(_read_bytes(path, 0, stat.st_size)), **CSV_READ_OPTIONS))
+        # Same column order as the rows that get copied over after it.
+        merged = df.reindex(columns=header).to_csv(index=False, lineterminator="\n").encode("utf-8")
+        with _write_lock:
+            tail = _read_bytes(path, stat.st_size, os.stat(path).st_size)
+            _replace_file(path, [merged, tail])
+            _publish_committed(path)
+            _move_cache_entry(path, stat, stat.st_size, len(merged), tail)
+    return len(df)
+
+
+def compact_snapshot(path=DATA_FILE, snapshot_path=None):
+    """
+    Merge the CSV delta into the parquet snapshot and empty the delta. Returns
+    the number of entries in the snapshot. The snapshot records how far into
+    the delta it reaches, so a crash before the delta is emptied loses nothing
+    and merges nothing twice.
+    """
+    snapshot_path = snapshot_path or snapshot_store.SNAPSHOT_FILE
+    with _compaction_lock:
+        _append_rows([], path)  # makes sure the delta exists and has its header
+        with _write_lock:
+            stat = os.stat(path)
+            header = _read_header(path)
+            header_line = _read_bytes(path, 0, stat.st_size).split(b"\n", 1)[0] + b"\n"
+        snapshot, snapshot_stamp, delta_mark = snapshot_store.read_snapshot(snapshot_path)
+        start = _delta_start(delta_mark, stat) or len(header_line)
+        delta = _parse_rows(_read_bytes(path, start, stat.st_size), header)
+        merged = apply_tombstones(pd.concat([snapshot, delta], ignore_index=True))
+        snapshot_store.write_snapshot(merged, snapshot_path, delta_mark=(stat.st_ino, stat.st_size))
+        with _cache_lock:
+            # Old snapshot + the whole delta == new snapshot + the delta past the mark.
+            entry = _cache.get(path)
+            if entry is not None and entry["snapshot_stamp"] == snapshot_stamp:
+                entry["snapshot_stamp"] = snapshot_store.snapshot_stamp(snapshot_path)
+        with _write_lock:
+            tail = _read_bytes(path, stat.st_size, os.stat(path).st_size)
+            _replace_file(path, [header_line, tail])
+            _publish_committed(path)
+            _move_cache_entry(path, stat, stat.st_size, len(header_line), tail)
+    return len(merged)
+
+
+def compact():
+    """Fold the append log into its compacted form. Returns the number of entries kept."""
+    if STORAGE_BACKEND == "parquet":
+        return compact_snapshot()
+    return compact_logs()
+
+
+def _compaction_due():
+    with _cache_lock:
+        entry = _cache.get(DATA_FILE)
+    if entry is None:
+        return False
+    if entry["tombstones"] >= COMPACT_THRESHOLD:
+        return True
+    return STORAGE_BACKEND == "parquet" and entry["size"] >= DELTA_COMPACT_BYTES
+
+
+def _start_compaction():
+    """Called by the writer after a flush; never blocks it."""
+    if not _compaction_lock.locked() and _compaction_due():
+        threading.Thread(target=compact, name="mindmate-compaction", daemon=True).start()
+
+
+# --- Backend Selection ---
+_sqlite_ready = False
+
+
+def _use_sqlite():
+    global _sqlite_ready
+    if STORAGE_BACKEND != "sqlite":
+        return False
+    if not _sqlite_ready:
+        if not sqlite_store.is_migrated():
+            sqlite_store.migrate_from_frames(read_csv_logs(), read_csv_routines())
+        _sqlite_ready = True
+    return True
+
+
+# --- Write Queue ---
+# Every session's writes go through one background thread per process, which
+# applies them in batches. Nothing does a read-modify-write behind another
+# session's back, and a burst of saves costs one flush instead of one each.
+def _write_csv_routines(routines, path=ROUTINE_FILE):
+    df_existing = read_csv_routines(path)
+    replaced = pd.Series(
+        list(zip(df_existing["username"], df_existing["date"])), index=df_existing.index, dtype=object
+    ).isin(list(routines))
+    df_new = pd.DataFrame(
+        [(date, activity, username) for (username, date), activities in routines.items() for activity in activities],
+        columns=ROUTINE_COLUMNS,
+    )
+    df_final = pd.concat([df_existing[~replaced], df_new], ignore_index=True)
+    _replace_file(path, [df_final.to_csv(index=False, lineterminator="\n").encode("utf-8")])
+
+
+def _flush_writes(mutations):
+    log_ops, routines = [], {}
+    for kind, args in mutations:
+        if kind == "log":
+            log_ops.append(("add", args[0]))
+        elif kind == "clear":
+            log_ops.append(("clear",) + args)
+        elif kind == "routine":
+            date, activities, username = args
+            routines[(username, date)] = activities
+
+    if _use_sqlite():
+        sqlite_store.write_batch(log_ops, routines)
+        return
+    # Routines first: rewriting them again is harmless, appending the logs twice is not,
+    # and a failed batch is retried one mutation at a time.
+    if routines:
+        with _write_lock:
+            _write_csv_routines(routines)
+    if log_ops:
+        _append_rows([
+            op[1] if op[0] == "add"
+            else {"date": op[2], "mood": TOMBSTONE_MOOD, "note": "", "username": op[1]}
+            for op in log_ops
+        ])
+        _start_compaction()
+
+
+def _get_writer():
+    return write_queue.get_writer(_flush_writes)
+
+
+# --- SQLite per-user cache ---
+# In SQLite mode a user's history and totals are built from their rows only
+# when load_user_version() changes, so an unchanged user costs one indexed
+# COUNT/MAX query per call instead of reading every row they have.
+MAX_CACHED_SQLITE_USERS = 256
+
+_sqlite_users = OrderedDict()
+_sqlite_users_lock = threading.Lock()
+
+
+def _sqlite_user(username):
+    """(version, UserHistory, UserAggregate) for the user's current rows in the database."""
+    version = sqlite_store.load_user_version(username)
+    with _sqlite_users_lock:
+        cached = _sqlite_users.get(username)
+        if cached is not None and cached[0] == version:
+            _sqlite_users.move_to_end(username)
+            return cached
+
+    rows = sqlite_store.load_user_logs(username)
+    cached = (
+        version,
+        MoodHistory(rows).user(username),
+        AggregateTable().apply_frame(rows, TOMBSTONE_MOOD).get(username),
+    )
+    with _sqlite_users_lock:
+        _sqlite_users[username] = cached
+        _sqlite_users.move_to_end(username)
+        while len(_sqlite_users) > MAX_CACHED_SQLITE_USERS:
+            _sqlite_users.popitem(last=False)
+    return cached
+
+
+# --- Public Data Access ---
+def load_data():
+    """All current mood logs, grouped by user and sorted by date. Built on each call; use sparingly."""
+    if _use_sqlite():
+        return sqlite_store.load_all_logs()
+    return _entry_logs(_current_entry())
+
+
+def load_user_logs(username):
+    """One user's mood logs as a fresh frame the caller may modify."""
+    if _use_sqlite():
+        return sqlite_store.load_user_logs(username)
+    history = _current_entry()["history"].user(username)
+    return _empty_logs() if history.empty else history.to_frame().drop(columns="Date")
+
+
+def load_user_history(username):
+    """One user's entries in the compact columnar form (see utils/mood_history.py)."""
+    if _use_sqlite():
+        return _sqlite_user(username)[1]
+    # The cached columns are kept current as rows arrive, so this is a lookup, not a build.
+    return _current_entry()["history"].user(username)
+
+
+def load_user_aggregate(username):
+    """Running mood totals for one user (see utils/mood_stats.py). Treat as read-only."""
+    if _use_sqlite():
+        return _sqlite_user(username)[2]
+    return _entry_aggregate(_current_entry(), username)
+
+
+def get_user_data_version(username):
+    """Token that changes whenever the user's entries do, for keying cached reports/charts."""
+    if _use_sqlite():
+        return ("sqlite",) + sqlite_store.load_user_version(username)
+    return load_user_aggregate(username).data_version
+
+
+def get_latest_mood(username, default=None):
+    """Mood of the user's most recent entry, without touching their history."""
+    if _use_sqlite():
+        mood = sqlite_store.load_latest_mood(username)
+    else:
+        mood = load_user_aggregate(username).last_mood
+    return mood if isinstance(mood, str) else default
+
+
+def add_new_log(username, new_log_entry):
+    """Queue a mood entry. Returns a Future that resolves once it is on disk."""
+    entry = dict(new_log_entry)
+    entry["username"] = username
+    entry["note"] = entry.get("note") or ""
+    return _get_writer().submit("log", entry)
+
+
+def clear_today_log(username, today_iso):
+    return _get_writer().submit("clear", username, today_iso)
+
+
+def load_today_routine(date, username):
+    if _use_sqlite():
+        return sqlite_store.load_routine(date, username)
+    df = read_csv_routines()
+    if "username" in df.columns and "date" in df.columns:
+        user_routine = df[(df["username"] == username) & (df["date"] == date)]
+        return user_routine["activity"].tolist()
+    return []
+
+
+def save_routine(date, activities, username):
+    """Queue a replacement of the user's routine for date. Returns a Future."""
+    return _get_writer().submit("routine", date, list(activities), username)
+
+
+if __name__ == "__main__":
+    # python -m utils.data_store compact  ->  fold the append log into its compacted form
+    import sys
+
+    if sys.argv[1:] == ["compact"]:
+        kept = compact()
+        print(f"{'Snapshot' if STORAGE_BACKEND == 'parquet' else DATA_FILE} now holds {kept} entries")
+    else:
+        print("usage: python -m utils.data_store compact")
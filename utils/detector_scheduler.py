@@ -0,0 +1,60 @@
+# utils/detector_scheduler.py
+import threading
+
+from utils import model_assets
+
+DETECTOR_BACKENDS = ("retinaface", "mtcnn", "opencv", "ssd", "dlib")
+# Rough seconds per scan on a CPU server, used until a backend has been timed here.
+PRIOR_LATENCY = {"opencv": 0.1, "ssd": 0.15, "dlib": 0.4, "mtcnn": 0.8, "retinaface": 2.0}
+MIN_SUCCESS_RATE = 0.6
+LATENCY_SMOOTHING = 0.3
+
+
+class DetectorScheduler:
+    """
+    Per-backend latency (moving average) and success rate, shared by every
+    session in the process. Reliable backends go first, fastest first.
+    """
+
+    def __init__(self, backends=DETECTOR_BACKENDS, min_success_rate=MIN_SUCCESS_RATE):
+        self.backends = tuple(backends)
+        self.min_success_rate = min_success_rate
+        self.latency = {b: PRIOR_LATENCY.get(b, 1.0) for b in self.backends}
+        self.attempts = dict.fromkeys(self.backends, 0)
+        self.successes = dict.fromkeys(self.backends, 0)
+        self._lock = threading.Lock()
+
+    def success_rate(self, backend):
+        # Smoothed, so one early miss doesn't bench a backend for good.
+        return (self.successes[backend] + 1) / (self.attempts[backend] + 2)
+
+    def record(self, backend, ok, seconds):
+        with self._lock:
+            self.attempts[backend] += 1
+            self.successes[backend] += bool(ok)
+            self.latency[backend] += LATENCY_SMOOTHING * (seconds - self.latency[backend])
+
+    def record_attempts(self, attempts):
+        """Record a scan's (backend, seconds, error) attempts, as reported back by a worker process."""
+        for backend, seconds, error in attempts:
+            if backend in self.latency:
+                self.record(backend, error is None, seconds)
+
+    def order(self):
+        with self._lock:
+            return sorted(
+                self.backends,
+                key=lambda b: (self.success_rate(b) < self.min_success_rate, self.latency[b]),
+            )
+
+    def stats(self):
+        with self._lock:
+            return {
+                b: {"attempts": self.attempts[b], "success_rate": self.success_rate(b), "latency": self.latency[b]}
+                for b in self.backends
+            }
+
+
+# Backends whose weights can't be had are left out rather than failing every scan.
+# With worker processes, the server's copy decides the order and the workers report back to it.
+scheduler = DetectorScheduler(b for b in DETECTOR_BACKENDS if model_assets.available(b))
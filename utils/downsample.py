@@ -0,0 +1,37 @@
+# utils/downsample.py
+import numpy as np
+
+# A 9-inch chart at 150 dpi is ~1350 px wide; a few pixels per point is all the eye can tell apart.
+TREND_MAX_POINTS = 400
+
+
+def lttb(x, y, max_points=TREND_MAX_POINTS):
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps when thinning a
+    line to max_points. The first and last points always stay; short series
+    come back untouched. x must be numeric and sorted.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # max_points - 2 buckets over the interior points; every bucket holds at least one.
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    chosen = 0
+    for bucket in range(max_points - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_lo, next_hi = hi, edges[bucket + 2]
+            avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # Twice the triangle area (previous pick, candidate, next bucket's average).
+        area = np.abs((x[chosen] - avg_x) * (y[lo:hi] - y[chosen]) - (x[chosen] - x[lo:hi]) * (avg_y - y[chosen]))
+        chosen = lo + int(np.argmax(area))
+        keep[bucket + 1] = chosen
+    return keep
@@ -0,0 +1,203 @@
+# utils/emotion_tflite.py
+"""
+Quantized TFLite copy of DeepFace's emotion classifier, for CPU-only servers.
+
+    python -m utils.emotion_tflite convert --quantization float16
+    python -m utils.emotion_tflite convert --quantization int8 --images faces/
+    python -m utils.emotion_tflite compare --images faces/
+
+Select it with MINDMATE_EMOTION_BACKEND=tflite-float16 (or tflite-int8).
+"""
+import argparse
+import glob
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from utils import model_assets
+
+# DeepFace is imported lazily below, but it reads DEEPFACE_HOME on first import.
+model_assets.configure()
+
+TFLITE_DIR = os.getenv("MINDMATE_TFLITE_DIR", model_assets.MODEL_DIR)
+QUANTIZATIONS = ("float16", "int8")
+CALIBRATION_SAMPLES = 200
+
+
+def tflite_path(quantization):
+    return os.path.join(TFLITE_DIR, f"emotion_{quantization}.tflite")
+
+
+def convert(keras_model, quantization, calibration_faces=None):
+    """
+    Serialized TFLite model. float16 halves the weights; int8 quantizes weights
+    and activations, calibrated on `calibration_faces` (prepared 48x48x1 inputs).
+    Inputs and outputs stay float32 either way, so callers don't change.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if calibration_faces is None or not len(calibration_faces):
+            raise ValueError("int8 conversion needs calibration faces (--images)")
+
+        def representative_dataset():
+            for face in calibration_faces[:CALIBRATION_SAMPLES]:
+                yield [face[np.newaxis].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+    else:
+        raise ValueError(f"Unknown quantization {quantization!r}; expected one of {QUANTIZATIONS}")
+    return converter.convert()
+
+
+class TFLiteEmotionModel:
+    """Drop-in for the Keras model's predict(batch) on top of the TFLite interpreter."""
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self._interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=os.cpu_count())
+        self._input = self._interpreter.get_input_details()[0]["index"]
+        self._output = self._interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+        # One interpreter, one inference at a time.
+        self._lock = threading.Lock()
+
+    def predict(self, batch, verbose=0):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if self._batch_size != len(batch):
+                self._interpreter.resize_tensor_input(self._input, batch.shape)
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            self._interpreter.set_tensor(self._input, batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output).copy()
+
+
+def load_tflite_model(quantization):
+    """
+    The quantized model, converted from DeepFace's weights on first use
+    (float16 only; int8 has to be built with calibration images via the CLI).
+    """
+    path = tflite_path(quantization)
+    if not os.path.exists(path):
+        if quantization != "float16":
+            raise FileNotFoundError(
+                f"{path} not found; build it with "
+                f"`python -m utils.emotion_tflite convert --quantization {quantization} --images <dir>`"
+            )
+        if not model_assets.available("emotion"):
+            raise FileNotFoundError(model_assets.health_check(["emotion"])["emotion"])
+        from deepface import DeepFace
+        model_bytes = convert(DeepFace.build_model("Emotion"), quantization)
+        # Every pool worker may convert at once; if another finished first, load theirs.
+        if not os.path.exists(path):
+            save(model_bytes, path)
+    return TFLiteEmotionModel(path)
+
+
+def save(model_bytes, path):
+    """Write via a temp file of this process's own, so concurrent writers never share one."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(model_bytes)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_faces(image_dir):
+    """Prepared 48x48x1 inputs for every face the opencv detector finds under image_dir."""
+    import cv2
+    from deepface.detectors import FaceDetector
+    from utils.face_models import get_detector, prepare_face
+
+    faces = []
+    for path in sorted(glob.glob(os.path.join(image_dir, "**", "*"), recursive=True)):
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        detections = FaceDetector.detect_faces(get_detector("opencv"), "opencv", img, align=True)
+        # Photos that are already tight face crops come back with no detection.
+        crops = [d[0] for d in detections if d[0] is not None and d[0].size] or [img]
+        faces.extend(prepare_face(crop) for crop in crops)
+    return np.stack(faces) if faces else np.empty((0, 48, 48, 1), dtype=np.float32)
+
+
+def _time_per_batch(model, faces, batch_size, repeats):
+    batches = [faces[i:i + batch_size] for i in range(0, len(faces), batch_size)]
+    model.predict(batches[0], verbose=0)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for batch in batches:
+            model.predict(batch, verbose=0)
+    return (time.perf_counter() - started) / (repeats * len(batches))
+
+
+def compare(faces, batch_size=1, repeats=5):
+    """Top-1 agreement, probability drift and latency of each TFLite variant against Keras."""
+    from deepface import DeepFace
+
+    keras_model = DeepFace.build_model("Emotion")
+    reference = keras_model.predict(faces, verbose=0)
+    rows = [("keras", 1.0, 0.0, _time_per_batch(keras_model, faces, batch_size, repeats), None)]
+    for quantization in QUANTIZATIONS:
+        path = tflite_path(quantization)
+        if not os.path.exists(path):
+            continue
+        model = TFLiteEmotionModel(path)
+        predictions = model.predict(faces)
+        rows.append((
+            f"tflite-{quantization}",
+            float(np.mean(predictions.argmax(axis=1) == reference.argmax(axis=1))),
+            float(np.abs(predictions - reference).max(axis=1).mean()),
+            _time_per_batch(model, faces, batch_size, repeats),
+            os.path.getsize(path),
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert_cmd = sub.add_parser("convert", help="build a quantized TFLite emotion model")
+    convert_cmd.add_argument("--quantization", choices=QUANTIZATIONS, default="float16")
+    convert_cmd.add_argument("--images", help="directory of face photos (needed for int8 calibration)")
+    compare_cmd = sub.add_parser("compare", help="accuracy/latency of the TFLite models against Keras")
+    compare_cmd.add_argument("--images", required=True, help="directory of face photos")
+    compare_cmd.add_argument("--batch-size", type=int, default=1)
+    compare_cmd.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        from deepface import DeepFace
+        faces = load_faces(args.images) if args.images else None
+        model_bytes = convert(DeepFace.build_model("Emotion"), args.quantization, faces)
+        path = tflite_path(args.quantization)
+        save(model_bytes, path)
+        print(f"Wrote {path} ({len(model_bytes) / 1e6:.1f} MB)")
+        return
+
+    faces = load_faces(args.images)
+    if not len(faces):
+        parser.error(f"no readable images under {args.images}")
+    print(f"{len(faces)} faces, batch size {args.batch_size}")
+    print(f"{'backend':<16}{'top-1 agree':>12}{'max |dp|':>10}{'ms/batch':>10}{'size MB':>9}")
+    for name, agreement, drift, seconds, size in compare(faces, args.batch_size, args.repeats):
+        size_text = f"{size / 1e6:.1f}" if size else "-"
+        print(f"{name:<16}{agreement:>12.1%}{drift:>10.3f}{seconds * 1000:>10.2f}{size_text:>9}")
+
+
+if __name__ == "__main__":
+    main()
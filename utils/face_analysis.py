@@ -0,0 +1,204 @@
+# utils/face_analysis.py
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+from utils import model_assets
+
+# DeepFace resolves its weights directory from DEEPFACE_HOME at import time.
+model_assets.configure()
+from deepface.detectors import FaceDetector  # noqa: E402
+
+from utils.detector_scheduler import scheduler  # noqa: E402
+from utils.face_models import EMOTION_LABELS, get_detector, predict_emotions  # noqa: E402
+
+RACE_BACKENDS = os.getenv("MINDMATE_FACE_RACE", "0") == "1"
+# Frames are shrunk to this longest edge before detection; a face still spans plenty of pixels.
+MAX_EDGE = int(os.getenv("MINDMATE_FACE_MAX_EDGE", "480"))
+
+_race_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mindmate-detector")
+
+
+def decode_image(data):
+    """Encoded image bytes (JPEG/PNG from the camera) to a BGR array, as DeepFace expects."""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode the captured image")
+    return img
+
+
+def downscale(img, max_edge=MAX_EDGE):
+    """Shrink so the longest edge is at most max_edge; smaller frames are returned as is."""
+    scale = max_edge / max(img.shape[:2])
+    if scale >= 1:
+        return img
+    size = (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def _largest_face(detections):
+    """The biggest usable crop from FaceDetector.detect_faces, or None."""
+    # Entries are (face, region) or (face, region, confidence) depending on the DeepFace version.
+    faces = [d[0] for d in detections if d[0] is not None and d[0].size]
+    return max(faces, key=lambda face: face.shape[0] * face.shape[1], default=None)
+
+
+def _try_backend(img, backend):
+    """(aligned face crop or None, seconds, error or None) for one detector; records the outcome."""
+    started = time.perf_counter()
+    try:
+        crop = _largest_face(FaceDetector.detect_faces(get_detector(backend), backend, img, align=True))
+        error = None if crop is not None else "Face could not be detected"
+    except Exception as e:
+        crop, error = None, str(e)
+    seconds = time.perf_counter() - started
+    scheduler.record(backend, crop is not None, seconds)
+    return crop, seconds, error
+
+
+def _race(img, backends):
+    """Run two backends side by side and keep the first success; the slower one still gets recorded."""
+    pending = {_race_pool.submit(_try_backend, img, b): b for b in backends}
+    attempts = []
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            backend = pending.pop(future)
+            crop, seconds, error = future.result()
+            attempts.append((backend, seconds, error))
+            if crop is not None:
+                return crop, backend, seconds, attempts
+    return None, None, None, attempts
+
+
+def find_face(img, race=RACE_BACKENDS, order=None):
+    """
+    (crop, backend, seconds, attempts) for the face in a downscaled frame,
+    trying detectors in `order` (default: this process's scheduler order);
+    crop is None if none found it.
+    """
+    order = list(order or scheduler.order())
+    attempts = []
+
+    if race and len(order) > 1:
+        crop, backend, seconds, raced = _race(img, order[:2])
+        attempts.extend(raced)
+        if crop is not None:
+            return crop, backend, seconds, attempts
+        order = order[2:]
+
+    for backend in order:
+        crop, seconds, error = _try_backend(img, backend)
+        attempts.append((backend, seconds, error))
+        if crop is not None:
+            return crop, backend, seconds, attempts
+    return None, None, None, attempts
+
+
+def analyze_face(img, race=RACE_BACKENDS, order=None):
+    """
+    Dominant emotion for the face in `img` (a decoded BGR array).
+
+    The frame is downscaled, a face is found with the scheduled detectors and
+    only the emotion classifier runs on the crop.
+
+    Returns {"mood", "confidence", "backend", "seconds", "total_seconds",
+    "low_confidence", "attempts"}; mood is None if even the whole-frame
+    fallback failed.
+    """
+    started = time.perf_counter()
+    result = {
+        "mood": None, "confidence": None, "backend": None, "seconds": None,
+        "low_confidence": False, "attempts": [],
+    }
+    img = downscale(img)
+    crop, backend, seconds, attempts = find_face(img, race, order)
+    result.update(backend=backend, seconds=seconds, attempts=attempts)
+
+    if crop is None:
+        # Last resort: classify the whole frame without a detected face.
+        crop = img
+        result.update(backend="whole frame", low_confidence=True)
+
+    try:
+        probabilities = predict_emotions([crop])[0]
+        best = int(np.argmax(probabilities))
+        result.update(mood=EMOTION_LABELS[best].capitalize(), confidence=float(probabilities[best]))
+    except Exception as e:
+        result["attempts"].append(("emotion model", 0.0, str(e)))
+
+    result["total_seconds"] = time.perf_counter() - started
+    return result
+
+
+def combine_predictions(probabilities):
+    """
+    One probability vector from several frames, each weighted by its own
+    confidence (top probability), so blurry or half-turned frames count less.
+    """
+    weights = probabilities.max(axis=1)
+    return (probabilities * weights[:, np.newaxis]).sum(axis=0) / weights.sum()
+
+
+def analyze_burst(frames, race=RACE_BACKENDS, order=None):
+    """
+    Dominant emotion across several BGR frames of the same person. Faces are
+    found per frame, then every crop goes through the classifier in a single
+    batch and the per-frame predictions are combined by confidence.
+
+    Returns {"mood", "confidence", "frames", "faces", "frame_moods",
+    "total_seconds", "attempts"}; mood is None if no frame had a face.
+    """
+    started = time.perf_counter()
+    crops, attempts = [], []
+    for img in frames:
+        crop, _, _, frame_attempts = find_face(downscale(img), race, order)
+        attempts.extend(frame_attempts)
+        if crop is not None:
+            crops.append(crop)
+
+    result = {"mood": None, "confidence": None, "frames": len(frames), "faces": len(crops),
+              "frame_moods": [], "attempts": attempts}
+    if crops:
+        probabilities = predict_emotions(crops)
+        combined = combine_predictions(probabilities)
+        best = int(np.argmax(combined))
+        result.update(
+            mood=EMOTION_LABELS[best].capitalize(),
+            confidence=float(combined[best]),
+            frame_moods=[EMOTION_LABELS[i].capitalize() for i in probabilities.argmax(axis=1)],
+        )
+    result["total_seconds"] = time.perf_counter() - started
+    return result
+
+
+def sample_clip_frames(data, max_frames):
+    """Up to max_frames evenly spaced BGR frames from an encoded video clip."""
+    # OpenCV only opens videos from a path, so the clip takes one trip through a temp file.
+    with tempfile.NamedTemporaryFile(suffix=".video") as clip:
+        clip.write(data)
+        clip.flush()
+        capture = cv2.VideoCapture(clip.name)
+        try:
+            total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            if total <= 0:
+                raise ValueError("Could not read the uploaded clip")
+            wanted = set(np.linspace(0, total - 1, min(max_frames, total)).astype(int).tolist())
+            frames = []
+            for index in range(max(wanted) + 1):
+                # grab() skips decoding the frames we don't keep
+                if not capture.grab():
+                    break
+                if index in wanted:
+                    ok, frame = capture.retrieve()
+                    if ok:
+                        frames.append(frame)
+        finally:
+            capture.release()
+    if not frames:
+        raise ValueError("Could not read the uploaded clip")
+    return frames
@@ -0,0 +1,108 @@
+# utils/face_models.py
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from utils import model_assets
+
+# DeepFace resolves its weights directory from DEEPFACE_HOME at import time.
+model_assets.configure()
+from deepface import DeepFace  # noqa: E402
+from deepface.detectors import FaceDetector  # noqa: E402
+
+EMOTION_LABELS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+EMOTION_INPUT_SIZE = (48, 48)
+# keras (DeepFace's own model), tflite-float16 or tflite-int8
+EMOTION_BACKEND = os.getenv("MINDMATE_EMOTION_BACKEND", "keras")
+PRELOAD_DETECTORS = model_assets.DETECTORS
+
+_lock = threading.Lock()
+_emotion_model = None
+_detectors = {}
+
+
+def get_emotion_model():
+    """
+    The emotion classifier for EMOTION_BACKEND, built once per process.
+    In offline mode (see model_assets.offline) raises FileNotFoundError if
+    the weights are missing, instead of letting build_model() try to
+    download them in the middle of a scan.
+    """
+    global _emotion_model
+    if _emotion_model is None:
+        with _lock:
+            if _emotion_model is None:
+                if EMOTION_BACKEND.startswith("tflite-"):
+                    from utils.emotion_tflite import load_tflite_model
+                    _emotion_model = load_tflite_model(EMOTION_BACKEND[len("tflite-"):])
+                else:
+                    if not model_assets.available("emotion"):
+                        raise FileNotFoundError(model_assets.health_check(["emotion"])["emotion"])
+                    _emotion_model = DeepFace.build_model("Emotion")
+    return _emotion_model
+
+
+def get_detector(backend):
+    """The face detector network for `backend`, built once per process."""
+    detector = _detectors.get(backend)
+    if detector is None:
+        with _lock:
+            detector = _detectors.get(backend)
+            if detector is None:
+                detector = _detectors[backend] = FaceDetector.build_model(backend)
+    return detector
+
+
+def prepare_face(face):
+    """
+    BGR face crop -> 48x48 grayscale in [0, 1], letterboxed like DeepFace's
+    own preprocessing so the classifier sees what it was trained on.
+    """
+    if face.dtype != np.uint8:
+        # detect_faces hands back float crops on some backends
+        face = np.clip(face * 255 if face.max() <= 1 else face, 0, 255).astype(np.uint8)
+    if face.ndim == 3:
+        face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    target_h, target_w = EMOTION_INPUT_SIZE
+    scale = min(target_h / face.shape[0], target_w / face.shape[1])
+    resized = cv2.resize(face, (max(1, int(face.shape[1] * scale)), max(1, int(face.shape[0] * scale))))
+    pad_h, pad_w = target_h - resized.shape[0], target_w - resized.shape[1]
+    padded = np.pad(resized, ((pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2)))
+    return padded.astype(np.float32)[..., np.newaxis] / 255.0
+
+
+def predict_emotions(faces):
+    """Emotion probabilities, one row per face crop in EMOTION_LABELS order."""
+    batch = np.stack([prepare_face(face) for face in faces])
+    return get_emotion_model().predict(batch, verbose=0)
+
+
+def warm_up(backends=PRELOAD_DETECTORS):
+    """
+    Build the emotion model and the given detectors and push a blank image
+    through each, so the first real scan doesn't pay for graph tracing.
+    Returns {name: seconds taken} or {name: error message} per model.
+    """
+    report = {}
+    started = time.perf_counter()
+    try:
+        predict_emotions([np.zeros((*EMOTION_INPUT_SIZE, 3), dtype=np.uint8)])
+        report["emotion"] = time.perf_counter() - started
+    except Exception as e:
+        report["emotion"] = f"failed: {e}"
+
+    blank = np.zeros((224, 224, 3), dtype=np.uint8)
+    for backend in backends:
+        if not model_assets.available(backend):
+            report[backend] = f"skipped, {model_assets.health_check([backend])[backend]}"
+            continue
+        started = time.perf_counter()
+        try:
+            FaceDetector.detect_faces(get_detector(backend), backend, blank, align=False)
+            report[backend] = time.perf_counter() - started
+        except Exception as e:
+            report[backend] = f"failed: {e}"
+    return report
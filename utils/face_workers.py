@@ -0,0 +1,145 @@
+# utils/face_workers.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Nothing here imports DeepFace/TensorFlow; only the worker processes load them.
+WORKERS = int(os.getenv("MINDMATE_FACE_WORKERS", "2"))
+# Jobs allowed in flight (running or queued) before new scans are turned away.
+MAX_PENDING = int(os.getenv("MINDMATE_FACE_MAX_PENDING", str(max(WORKERS, 1) * 2)))
+JOB_TIMEOUT = float(os.getenv("MINDMATE_FACE_TIMEOUT", "20"))
+# 1 = load the models as soon as the app opens; by default they load once the Mood Tracker's scan tab is reached.
+PRELOAD = os.getenv("MINDMATE_FACE_PRELOAD", "0") == "1"
+# Photos per burst scan, and frames sampled from an uploaded clip.
+BURST_FRAMES = int(os.getenv("MINDMATE_BURST_FRAMES", "5"))
+
+_pool = None
+_started = False
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+
+
+class FaceWorkersBusy(RuntimeError):
+    """Every worker slot is taken; the caller should suggest text logging instead."""
+
+
+def _init_worker():
+    from utils.face_models import warm_up
+    warm_up()
+
+
+def _ping():
+    return os.getpid()
+
+
+# Jobs get the detector order from the server process (None: use this process's own
+# scheduler), so every worker follows, and feeds, the same latency/success stats.
+def _analyze_job(data, order):
+    from utils.face_analysis import analyze_face, decode_image
+    return analyze_face(decode_image(data), order=order)
+
+
+def _burst_job(images, order):
+    from utils.face_analysis import analyze_burst, decode_image
+    return analyze_burst([decode_image(data) for data in images], order=order)
+
+
+def _clip_job(data, order):
+    from utils.face_analysis import analyze_burst, sample_clip_frames
+    return analyze_burst(sample_clip_frames(data, BURST_FRAMES), order=order)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: TensorFlow doesn't survive being forked from a threaded server.
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _reset_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def start_workers():
+    """
+    Spin up the pool and have every worker load its models now rather than on
+    the first scan; in-process mode warms them on a background thread instead.
+    Never blocks, and only the first call does anything.
+    """
+    global _started
+    with _pool_lock:
+        if _started:
+            return WORKERS
+        _started = True
+    if WORKERS <= 0:
+        threading.Thread(target=_init_worker, name="mindmate-face-warmup", daemon=True).start()
+        return 0
+    pool = _get_pool()
+    for _ in range(WORKERS):
+        pool.submit(_ping)
+    return WORKERS
+
+
+def preload():
+    """start_workers() at app start, but only if MINDMATE_FACE_PRELOAD=1 asks for it."""
+    if PRELOAD:
+        start_workers()
+
+
+def _run(job, arg, timeout):
+    """Run job(arg) on the pool, subject to the in-flight cap and the timeout."""
+    if WORKERS <= 0:
+        return job(arg, None)
+
+    if not _slots.acquire(blocking=False):
+        raise FaceWorkersBusy("All face-analysis workers are busy")
+    from utils.detector_scheduler import scheduler
+    pool = _get_pool()
+    try:
+        future = pool.submit(job, arg, scheduler.order())
+    except BrokenProcessPool:
+        _slots.release()
+        _reset_pool(pool)
+        raise
+    # A timed-out job can't be stopped mid-inference, so it holds its slot until it really ends.
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        result = future.result(timeout=timeout)
+    except BrokenProcessPool:
+        # A worker died (out of memory, usually); start fresh on the next scan.
+        _reset_pool(pool)
+        raise
+    scheduler.record_attempts(result["attempts"])
+    return result
+
+
+def analyze_face_bytes(data, timeout=JOB_TIMEOUT):
+    """
+    analyze_face() for encoded image bytes, run on the shared worker pool.
+    Raises FaceWorkersBusy when MAX_PENDING scans are already in flight and
+    concurrent.futures.TimeoutError if the result takes longer than `timeout`.
+    With MINDMATE_FACE_WORKERS=0 the analysis runs in this process instead.
+    """
+    return _run(_analyze_job, data, timeout)
+
+
+def analyze_burst_bytes(images, timeout=JOB_TIMEOUT):
+    """analyze_burst() for a list of encoded images, as one job."""
+    return _run(_burst_job, list(images), timeout)
+
+
+def analyze_clip_bytes(data, timeout=JOB_TIMEOUT):
+    """analyze_burst() over frames sampled from an encoded video clip, as one job."""
+    return _run(_clip_job, data, timeout)
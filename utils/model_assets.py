@@ -0,0 +1,188 @@
+# utils/model_assets.py
+"""
+Local store for the face-analysis model weights, so nodes without network
+access never try to download them on the first scan.
+
+    python -m utils.model_assets fetch                 # on a connected machine: download + record checksums
+    python -m utils.model_assets record --from ~/.deepface/weights
+    python -m utils.model_assets check                 # exit status 1 if anything is missing or corrupt
+
+The weights live in MINDMATE_MODEL_DIR/.deepface/weights (DEEPFACE_HOME is
+pointed at MINDMATE_MODEL_DIR) next to a manifest.json of SHA-256 checksums.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+MODEL_DIR = os.path.abspath(os.getenv("MINDMATE_MODEL_DIR", "models"))
+MANIFEST_FILE = os.path.join(MODEL_DIR, "manifest.json")
+
+# Files DeepFace 0.0.75 fetches into <DEEPFACE_HOME>/.deepface/weights. opencv and
+# mtcnn ship their weights inside their pip packages, so they need nothing here.
+ASSETS = {
+    "emotion": ("facial_expression_model_weights.h5",),
+    "retinaface": ("retinaface.h5",),
+    "ssd": ("deploy.prototxt", "res10_300x300_ssd_iter_140000.caffemodel"),
+    "dlib": ("shape_predictor_5_face_landmarks.dat",),
+    "opencv": (),
+    "mtcnn": (),
+}
+
+# The models the app actually uses: the emotion classifier plus the preloaded detectors.
+DETECTORS = tuple(
+    backend.strip()
+    for backend in os.getenv("MINDMATE_FACE_DETECTORS", "opencv,ssd,mtcnn,retinaface").split(",")
+    if backend.strip()
+)
+REQUIRED_MODELS = ("emotion",) + DETECTORS
+# Never let DeepFace download weights: when asked to, or once a manifest has been
+# recorded here (the directory was prepared for an offline server).
+OFFLINE = os.getenv("MINDMATE_OFFLINE_MODELS", "0") == "1"
+
+_health = None
+
+
+def configure():
+    """Point DeepFace at MODEL_DIR. Must run before deepface is imported."""
+    os.environ.setdefault("DEEPFACE_HOME", MODEL_DIR)
+    os.makedirs(weights_dir(), exist_ok=True)
+
+
+def weights_dir():
+    return os.path.join(os.environ.get("DEEPFACE_HOME", MODEL_DIR), ".deepface", "weights")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest():
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def record_manifest(source_dir=None):
+    """
+    Checksum every weight file into manifest.json, copying them in from
+    source_dir first if given (e.g. an existing ~/.deepface/weights).
+    """
+    target = weights_dir()
+    os.makedirs(target, exist_ok=True)
+    if source_dir:
+        for name in os.listdir(source_dir):
+            if os.path.isfile(os.path.join(source_dir, name)):
+                shutil.copy2(os.path.join(source_dir, name), os.path.join(target, name))
+
+    manifest = {
+        name: {"sha256": file_sha256(os.path.join(target, name)), "size": os.path.getsize(os.path.join(target, name))}
+        for name in sorted(os.listdir(target))
+        if os.path.isfile(os.path.join(target, name))
+    }
+    tmp_path = f"{MANIFEST_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
+    return manifest
+
+
+def check(models, verify_checksums=True):
+    """
+    {"missing": [...], "corrupt": [...], "unverified": [...]} for the weight
+    files `models` need; unverified files are present but not in the manifest.
+    """
+    manifest = read_manifest()
+    report = {"missing": [], "corrupt": [], "unverified": []}
+    for model in models:
+        for name in ASSETS.get(model, ()):
+            path = os.path.join(weights_dir(), name)
+            expected = manifest.get(name)
+            if not os.path.isfile(path):
+                report["missing"].append(name)
+            elif expected is None:
+                report["unverified"].append(name)
+            elif os.path.getsize(path) != expected["size"] or (verify_checksums and file_sha256(path) != expected["sha256"]):
+                report["corrupt"].append(name)
+    return report
+
+
+def health_check(models=None, refresh=False):
+    """
+    Cached check() over every model; {model: "ok" | "missing: ..." | "corrupt: ..."}.
+    Cheap to call from page code: checksums are only computed once per process.
+    """
+    global _health
+    if _health is None or refresh:
+        health = {}
+        for model in ASSETS:
+            report = check([model])
+            problems = [f"{kind}: {', '.join(names)}" for kind, names in report.items() if names and kind != "unverified"]
+            health[model] = "; ".join(problems) or "ok"
+        _health = health
+    return {m: s for m, s in _health.items() if models is None or m in models}
+
+
+def offline():
+    return OFFLINE or os.path.isfile(MANIFEST_FILE)
+
+
+def available(model):
+    """
+    True if `model` may be built: always when DeepFace is allowed to fetch
+    what's missing, otherwise only if its weights are in place and intact.
+    """
+    if not offline():
+        return True
+    return health_check([model]).get(model, "ok") == "ok"
+
+
+def fetch(models=tuple(ASSETS)):
+    """Build each model once (DeepFace downloads what's missing), then record checksums."""
+    configure()
+    from deepface import DeepFace
+    from deepface.detectors import FaceDetector
+
+    for model in models:
+        if model == "emotion":
+            DeepFace.build_model("Emotion")
+        else:
+            try:
+                FaceDetector.build_model(model)
+            except Exception as e:
+                # dlib isn't in requirements.txt; skip what can't be installed here.
+                print(f"skipped {model}: {e}", file=sys.stderr)
+    return record_manifest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("fetch", help="download every model's weights and record their checksums")
+    record_cmd = sub.add_parser("record", help="record checksums of the weights already in place")
+    record_cmd.add_argument("--from", dest="source_dir", help="copy weight files from this directory first")
+    sub.add_parser("check", help="report missing or corrupt weights for the models in use")
+    args = parser.parse_args()
+    configure()
+
+    if args.command in ("fetch", "record"):
+        manifest = fetch() if args.command == "fetch" else record_manifest(args.source_dir)
+        print(f"Recorded {len(manifest)} files in {MANIFEST_FILE}")
+        return
+
+    health = health_check(REQUIRED_MODELS)
+    for model, status in health.items():
+        print(f"{model:<12}{status}")
+    sys.exit(0 if all(status == "ok" for status in health.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
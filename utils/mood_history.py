@@ -0,0 +1,210 @@
+# utils/mood_history.py
+import datetime
+
+import numpy as np
+import pandas as pd
+
+MISSING_DAY = np.iinfo(np.int32).min
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def day_number(date):
+    return (date - EPOCH).days
+
+
+def day_numbers(dates):
+    """Date strings -> int32 days since 1970-01-01 (MISSING_DAY where unparseable)."""
+    days = pd.to_datetime(dates, errors="coerce").to_numpy(dtype="datetime64[D]")
+    return np.where(np.isnat(days), MISSING_DAY, days.astype(np.int64)).astype(np.int32)
+
+
+def note_column(df):
+    if "note" not in df.columns:
+        return np.full(len(df), "", dtype=object)
+    # One string object per distinct note, however many rows repeat it.
+    codes, uniques = pd.factorize(df["note"].fillna(""))
+    return np.array([str(note) for note in uniques] + [""], dtype=object)[codes]
+
+
+class UserColumns:
+    """One user's entries sorted by date, as parallel arrays. Replaced on change, never modified."""
+
+    __slots__ = ("codes", "days", "notes")
+
+    def __init__(self, codes, days, notes):
+        self.codes = codes
+        self.days = days
+        self.notes = notes
+
+
+EMPTY_COLUMNS = UserColumns(np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int32), np.empty(0, dtype=object))
+
+
+class UserHistory:
+    """
+    One user's entries, sorted by date. codes/days are views into the user's
+    columns, so slicing a user never copies anything.
+    """
+
+    def __init__(self, history, username, columns, start, stop):
+        self._history = history
+        self._columns = columns
+        self._start = start
+        self.username = username
+        self.codes = columns.codes[start:stop]
+        self.days = columns.days[start:stop]
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def empty(self):
+        return len(self.codes) == 0
+
+    def between(self, start_date, end_date):
+        """Entries dated start_date..end_date inclusive, found by binary search; still a view."""
+        lo = np.searchsorted(self.days, day_number(start_date), side="left")
+        hi = np.searchsorted(self.days, day_number(end_date), side="right")
+        return self.part(lo, hi)
+
+    def tail(self, n):
+        """The n most recent entries."""
+        return self.part(max(0, len(self.codes) - n), len(self.codes))
+
+    def part(self, lo, hi):
+        """Entries lo..hi (positions within this slice)."""
+        return UserHistory(self._history, self.username, self._columns, self._start + lo, self._start + hi)
+
+    def mood_counts(self):
+        """{mood: count} for just these entries, counted over the int8 codes."""
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self._history.categories))
+        return {self._history.categories[i]: int(c) for i, c in enumerate(counts) if c}
+
+    def first_date(self):
+        # Unparseable dates sort first, so skip past them.
+        first = np.searchsorted(self.days, MISSING_DAY, side="right")
+        return EPOCH + datetime.timedelta(days=int(self.days[first])) if first < len(self.days) else None
+
+    def moods(self):
+        return self._history.mood_lookup[self.codes]
+
+    def dates(self):
+        """Entry dates as datetime64[D] (NaT where the stored date was unparseable)."""
+        dates = self.days.astype("datetime64[D]")
+        dates[self.days == MISSING_DAY] = np.datetime64("NaT")
+        return dates
+
+    def notes(self):
+        return self._columns.notes[self._start:self._start + len(self.codes)]
+
+    def to_frame(self, with_notes=True):
+        """Same shape as the CSV rows, plus a parsed `Date` column of datetime.date."""
+        dates = pd.Series(self.dates())
+        frame = pd.DataFrame({
+            "date": dates.dt.strftime("%Y-%m-%d"),
+            "mood": self.moods(),
+            "username": self.username,
+            "Date": dates.dt.date,
+        })
+        if with_notes:
+            frame.insert(2, "note", self.notes())
+        return frame
+
+
+class MoodHistory:
+    """
+    Every user's current entries in compact columns, kept per user:
+
+    moods   -> int8 codes (int16 past 127 moods, -1 for missing), looked up in `categories`
+    dates   -> int32 days since 1970-01-01
+    notes   -> one object column, "" where there is none
+
+    Built in one pass from a frame without tombstones, then kept current with
+    add_frame(): appended rows and tombstones only rebuild the columns of the
+    users they belong to. Columns are replaced rather than modified, so a
+    UserHistory handed out earlier stays valid.
+    """
+
+    def __init__(self, df=None):
+        self.categories = []
+        self.mood_lookup = np.array([None], dtype=object)
+        self.users = {}
+        self._category_codes = {}
+        if df is not None:
+            self._load(df)
+
+    def __len__(self):
+        return sum(len(columns.codes) for columns in self.users.values())
+
+    def _encode(self, moods):
+        """Mood codes for a column of moods, adding new moods to `categories`."""
+        codes, uniques = pd.factorize(moods, sort=False)
+        lookup = [self._category_codes.get(mood) for mood in uniques]
+        for i, mood in enumerate(uniques):
+            if lookup[i] is None:
+                lookup[i] = self._category_codes[mood] = len(self.categories)
+                self.categories.append(mood)
+        if len(uniques) and len(self.categories) >= len(self.mood_lookup):
+            # Trailing None so code -1 (missing mood) indexes to None.
+            self.mood_lookup = np.array(self.categories + [None], dtype=object)
+        code_dtype = np.int8 if len(self.categories) < np.iinfo(np.int8).max else np.int16
+        # Code -1 picks the appended -1.
+        return np.array(lookup + [-1], dtype=np.int16)[codes].astype(code_dtype)
+
+    def _load(self, df):
+        if df.empty or not {"date", "mood", "username"}.issubset(df.columns):
+            return
+        df = df[df["username"].notna()]
+        user_ids, usernames = pd.factorize(df["username"], sort=False)
+        codes = self._encode(df["mood"])
+        days = day_numbers(df["date"])
+        notes = note_column(df)
+        order = np.lexsort((np.arange(len(df)), days, user_ids))
+        offsets = np.searchsorted(user_ids[order], np.arange(len(usernames) + 1))
+        for user_id, username in enumerate(usernames):
+            rows = order[offsets[user_id]:offsets[user_id + 1]]
+            self.users[username] = UserColumns(codes[rows], days[rows], notes[rows])
+
+    def add_frame(self, df, tombstone_mood):
+        """Fold appended rows (tombstones included, in file order) into their users' columns."""
+        if df.empty or not {"date", "mood", "username"}.issubset(df.columns):
+            return self
+        df = df[df["username"].notna()]
+        is_tombstone = (df["mood"] == tombstone_mood).to_numpy()
+        codes = np.full(len(df), -1, dtype=np.int16)
+        codes[~is_tombstone] = self._encode(df["mood"][~is_tombstone])
+        days = day_numbers(df["date"])
+        notes = note_column(df)
+        for username, rows in df.groupby("username", sort=False).indices.items():
+            self.users[username] = self._merge(
+                self.users.get(username, EMPTY_COLUMNS), codes[rows], days[rows], notes[rows], is_tombstone[rows]
+            )
+        return self
+
+    def _merge(self, columns, codes, days, notes, is_tombstone):
+        merged_codes, merged_days, merged_notes = columns.codes, columns.days, columns.notes
+        start = 0
+        # Each tombstone clears the user's entries on its date written before it.
+        for stop in [*np.flatnonzero(is_tombstone), len(codes)]:
+            code_dtype = np.int8 if len(self.categories) < np.iinfo(np.int8).max else np.int16
+            merged_codes = np.concatenate([merged_codes, codes[start:stop].astype(code_dtype)])
+            merged_days = np.concatenate([merged_days, days[start:stop]])
+            merged_notes = np.concatenate([merged_notes, notes[start:stop]])
+            if stop < len(codes) and days[stop] != MISSING_DAY:
+                keep = merged_days != days[stop]
+                merged_codes, merged_days, merged_notes = merged_codes[keep], merged_days[keep], merged_notes[keep]
+            start = stop + 1
+        if len(merged_days) > 1 and (merged_days[1:] < merged_days[:-1]).any():
+            # A back-dated entry: re-sort by date, keeping write order within a day.
+            order = np.argsort(merged_days, kind="stable")
+            merged_codes, merged_days, merged_notes = merged_codes[order], merged_days[order], merged_notes[order]
+        return UserColumns(merged_codes, merged_days, merged_notes)
+
+    def user(self, username):
+        columns = self.users.get(username, EMPTY_COLUMNS)
+        return UserHistory(self, username, columns, 0, len(columns.codes))
+
+    def to_frame(self):
+        """Every user's entries as CSV-shaped rows, grouped by user and sorted by date."""
+        frames = [self.user(username).to_frame().drop(columns="Date") for username in self.users]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["date", "mood", "note", "username"])
@@ -0,0 +1,113 @@
+# utils/mood_stats.py
+import datetime
+import itertools
+
+import pandas as pd
+
+MOOD_SCORES = {"Happy": 5, "Neutral": 3, "Anxious": 2, "Sad": 1, "Angry": 1}
+DEFAULT_SCORE = 3
+
+_table_ids = itertools.count(1)
+
+
+class UserAggregate:
+    """
+    Running totals for one user, kept up to date one entry at a time:
+    mood counts, per-day moods and score sums, and the latest entry.
+    """
+
+    def __init__(self, table_id=0):
+        self.table_id = table_id
+        self.revision = 0
+        self.mood_counts = {}
+        self.daily_moods = {}
+        self.daily_score_sums = {}
+        self.entry_count = 0
+        self.score_sum = 0
+        self.last_mood = None
+        self.last_date = None
+
+    def add(self, date, mood):
+        self.revision += 1
+        score = MOOD_SCORES.get(mood, DEFAULT_SCORE)
+        self.mood_counts[mood] = self.mood_counts.get(mood, 0) + 1
+        self.daily_moods.setdefault(date, []).append(mood)
+        self.daily_score_sums[date] = self.daily_score_sums.get(date, 0) + score
+        self.entry_count += 1
+        self.score_sum += score
+        # ISO dates compare correctly as strings; on a tie the newest entry wins.
+        if self.last_date is None or date >= self.last_date:
+            self.last_date, self.last_mood = date, mood
+
+    def clear_day(self, date):
+        self.revision += 1
+        moods = self.daily_moods.pop(date, [])
+        if not moods:
+            return
+        for mood in moods:
+            self.mood_counts[mood] -= 1
+            if not self.mood_counts[mood]:
+                del self.mood_counts[mood]
+        self.entry_count -= len(moods)
+        self.score_sum -= self.daily_score_sums.pop(date)
+        if date == self.last_date:
+            # Only clearing the latest day needs a look at the other days.
+            self.last_date = max(self.daily_moods, default=None)
+            self.last_mood = self.daily_moods[self.last_date][-1] if self.last_date else None
+
+    @property
+    def data_version(self):
+        """Changes whenever this user's entries do; cheap key for caching derived output."""
+        return (self.table_id, self.revision, self.entry_count)
+
+    def logged_on(self, date):
+        return date in self.daily_moods
+
+    def window(self, end_date, days):
+        """Entry count, average score and most common mood over the `days` days ending at end_date."""
+        entries, score_sum, counts = 0, 0, {}
+        for offset in range(days):
+            day = (end_date - datetime.timedelta(days=offset)).isoformat()
+            moods = self.daily_moods.get(day)
+            if not moods:
+                continue
+            entries += len(moods)
+            score_sum += self.daily_score_sums[day]
+            for mood in moods:
+                counts[mood] = counts.get(mood, 0) + 1
+        dominant = None
+        if counts:
+            # Same tie-break as Series.mode()[0]: the smallest of the most frequent.
+            top = max(counts.values())
+            dominant = min(mood for mood, count in counts.items() if count == top)
+        return {
+            "entries": entries,
+            "average": score_sum / entries if entries else None,
+            "dominant_mood": dominant,
+        }
+
+
+class AggregateTable:
+    """UserAggregate per username, fed the raw log rows (tombstones included) in order."""
+
+    def __init__(self):
+        self.table_id = next(_table_ids)
+        self.users = {}
+
+    def apply_frame(self, df, tombstone_mood):
+        if df.empty or not {"date", "mood", "username"}.issubset(df.columns):
+            return self
+        for date, mood, username in df[["date", "mood", "username"]].itertuples(index=False, name=None):
+            if pd.isna(username) or pd.isna(date):
+                continue
+            user = self.users.get(username)
+            if user is None:
+                user = self.users[username] = UserAggregate(self.table_id)
+            if mood == tombstone_mood:
+                user.clear_day(date)
+            else:
+                user.add(date, mood)
+        return self
+
+    def get(self, username):
+        return self.users.get(username) or UserAggregate()
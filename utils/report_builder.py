@@ -0,0 +1,158 @@
+# utils/report_builder.py
+import datetime
+import tempfile
+import textwrap
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+# Finished reports stay in memory up to this size, then spill to a temp file.
+SPOOL_MAX_BYTES = 2 * 1024 * 1024
+# Entries are pulled from the history (notes included) this many at a time.
+CHUNK_SIZE = 500
+NOTE_WIDTH = 85
+MAX_JOBS = 32
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mindmate-report")
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def iter_entries_newest_first(history):
+    """(date, mood, note) for every entry, newest first, one chunk of notes in memory at a time."""
+    for hi in range(len(history), 0, -CHUNK_SIZE):
+        chunk = history.part(max(0, hi - CHUNK_SIZE), hi).to_frame()
+        yield from zip(chunk["date"][::-1], chunk["mood"][::-1], chunk["note"][::-1])
+
+
+def write_mood_report(out, username, history, mood_summary, total_entries, max_pages=None, on_progress=None):
+    """
+    Draw the mood log report into the file object `out`, page by page.
+    Stops after max_pages pages (if given) and reports progress as a 0..1 fraction.
+    """
+    p = canvas.Canvas(out, pagesize=A4, pageCompression=1)
+    width, height = A4
+    y = height - 50
+
+    p.setFont("Helvetica-Bold", 18)
+    p.drawString(50, y, "🧠 MindMates Mood Log Report")
+    y -= 20
+
+    p.setFont("Helvetica-Oblique", 10)
+    p.drawString(50, y, f"Generated for {username} on: {datetime.datetime.now().strftime('%B %d, %Y')}")
+    y -= 30
+
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(50, y, f"Total Entries: {total_entries}")
+    y -= 20
+
+    p.setFont("Helvetica", 11)
+    for mood, count in mood_summary.items():
+        p.drawString(70, y, f"• {mood}: {count}")
+        y -= 15
+
+    y -= 10
+    p.line(50, y, width - 50, y)
+    y -= 30
+
+    p.setFont("Helvetica", 12)
+    pages = 1
+    total = max(len(history), 1)
+
+    for entry_number, (date, mood, note) in enumerate(iter_entries_newest_first(history), start=1):
+        if y < 100:
+            if max_pages and pages >= max_pages:
+                p.setFillColor(colors.grey)
+                p.setFont("Helvetica-Oblique", 10)
+                p.drawString(50, y, f"Report truncated after {pages} pages ({entry_number - 1} of {len(history)} entries).")
+                break
+            p.showPage()
+            pages += 1
+            y = height - 50
+            p.setFont("Helvetica", 12)
+
+        p.setFillColor(colors.darkblue)
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(50, y, f"{entry_number}. {date} — {mood}")
+        y -= 20
+
+        if pd.notna(note) and str(note).strip():
+            p.setFont("Helvetica", 11)
+            p.setFillColor(colors.black)
+            for line in textwrap.wrap(str(note), NOTE_WIDTH):
+                p.drawString(70, y, "📝 " + line)
+                y -= 15
+            y -= 5
+
+        p.setFillColor(colors.grey)
+        p.line(50, y, width - 50, y)
+        y -= 25
+
+        if on_progress and entry_number % 50 == 0:
+            on_progress(entry_number / total)
+
+    p.save()
+    return pages
+
+
+class ReportJob:
+    """A report being built on the background pool; poll `progress` / `done`."""
+
+    def __init__(self, build_kwargs):
+        self.progress = 0.0
+        self.pages = 0
+        self.error = None
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        self._done = threading.Event()
+        self._read_lock = threading.Lock()
+        _executor.submit(self._run, build_kwargs)
+
+    def _run(self, build_kwargs):
+        try:
+            self.pages = write_mood_report(self._file, on_progress=self._set_progress, **build_kwargs)
+            self.progress = 1.0
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def _set_progress(self, fraction):
+        self.progress = min(fraction, 0.99)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def read_bytes(self):
+        # Several sessions may download the same finished report at once.
+        with self._read_lock:
+            self._file.seek(0)
+            return self._file.read()
+
+
+def get_or_start_report_job(key, **build_kwargs):
+    """The job for `key`, starting it if needed. Finished jobs are reused until evicted."""
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None and job.error is None:
+            _jobs.move_to_end(key)
+            return job
+        job = _jobs[key] = ReportJob(build_kwargs)
+        while len(_jobs) > MAX_JOBS:
+            # Another session may still be reading an evicted job, so its file is
+            # left for garbage collection to close once nobody holds the job.
+            _jobs.popitem(last=False)
+    return job
+
+
+def get_report_job(key):
+    with _jobs_lock:
+        return _jobs.get(key)
@@ -0,0 +1,92 @@
+# utils/snapshot_store.py
+import json
+import os
+
+import pandas as pd
+
+SNAPSHOT_FILE = os.getenv("MINDMATE_SNAPSHOT", "mood_logs.parquet")
+LOG_COLUMNS = ["date", "mood", "note", "username"]
+# Few distinct values repeated on every row: stored (and loaded) as codes plus a dictionary.
+CATEGORY_COLUMNS = ("date", "mood", "username")
+# Schema metadata: [inode, offset] of the CSV delta bytes already merged into the snapshot.
+DELTA_MARK_KEY = b"mindmate.delta_mark"
+
+def _pyarrow():
+    # pyarrow already ships with Streamlit, but only the parquet storage mode needs it.
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("MINDMATE_STORAGE=parquet requires the 'pyarrow' package") from e
+    return pa, pq
+
+
+def _to_frame(table):
+    """
+    pandas frame of a snapshot table with one Python object per distinct value,
+    not per row: dates and the dictionary columns come back as Categoricals of
+    the strings the CSV holds ("YYYY-MM-DD" dates), notes stay in Arrow memory.
+    """
+    pa, _ = _pyarrow()
+    for name in CATEGORY_COLUMNS:
+        index = table.schema.get_field_index(name)
+        column = table.column(index)
+        if pa.types.is_date32(column.type):
+            column = column.cast(pa.string())
+        if not pa.types.is_dictionary(column.type):
+            # Snapshots written before the columns were typed hold plain strings.
+            column = column.dictionary_encode()
+        table = table.set_column(index, name, column)
+    return table.to_pandas(types_mapper={pa.string(): pd.ArrowDtype(pa.string())}.get)
+
+
+def snapshot_stamp(path=SNAPSHOT_FILE):
+    """Changes whenever the snapshot is replaced; None if there is none."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def read_snapshot(path=SNAPSHOT_FILE):
+    """
+    Typed snapshot of the compacted logs. Returns (frame, stamp, delta_mark),
+    delta_mark being the (inode, offset) passed to write_snapshot, or None.
+    Not cached: callers fold it into their own compact form and let the frame go.
+    """
+    while True:
+        stamp = snapshot_stamp(path)
+        if stamp is None:
+            return pd.DataFrame(columns=LOG_COLUMNS), None, None
+        _, pq = _pyarrow()
+        table = pq.read_table(path)
+        mark = (table.schema.metadata or {}).get(DELTA_MARK_KEY)
+        frame = _to_frame(table)
+        # Replaced while being read: the stamp would not match the frame.
+        if snapshot_stamp(path) == stamp:
+            return frame, stamp, None if mark is None else tuple(json.loads(mark))
+
+
+def write_snapshot(df, path=SNAPSHOT_FILE, delta_mark=None):
+    """
+    Store the logs typed: date32 dates (null if unparseable), dictionary-encoded
+    mood/username. delta_mark records how much of the CSV delta is merged in, so
+    a compaction interrupted before it empties the delta is not merged twice.
+    """
+    pa, pq = _pyarrow()
+    df = df.reindex(columns=LOG_COLUMNS)
+    dates = pd.to_datetime(df["date"].astype("string"), format="%Y-%m-%d", errors="coerce")
+    table = pa.table({
+        "date": pa.array(dates).cast(pa.date32()),
+        "mood": pa.array(df["mood"].astype("string")).dictionary_encode(),
+        "note": pa.array(df["note"].fillna("").astype("string")),
+        "username": pa.array(df["username"].astype("string")).dictionary_encode(),
+    })
+    if delta_mark is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), DELTA_MARK_KEY: json.dumps(list(delta_mark))})
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
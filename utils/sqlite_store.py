@@ -0,0 +1,191 @@
+# utils/sqlite_store.py
+import contextlib
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+DB_FILE = os.getenv("MINDMATE_DB", "mindmate.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mood_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    date TEXT NOT NULL,
+    mood TEXT NOT NULL,
+    note TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_mood_logs_username_date ON mood_logs (username, date);
+
+CREATE TABLE IF NOT EXISTS routines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    date TEXT NOT NULL,
+    activity TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_routines_username_date ON routines (username, date);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Streamlit runs every rerun on a fresh thread, so per-thread connections would
+# be reopened on each one. Instead a few connections per process are pooled and
+# lent to one thread at a time; the schema is set up once, by the first of them.
+POOL_SIZE = 4
+
+_pool_lock = threading.Lock()
+_idle = {}
+_initialized = set()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    # A write's Future resolves after its commit, and callers take that to mean it is on disk.
+    conn.execute("PRAGMA synchronous=FULL")
+    with _pool_lock:
+        needs_schema = path not in _initialized
+    if needs_schema:
+        # WAL lets readers keep going while another session writes; it sticks to the file.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        with _pool_lock:
+            _initialized.add(path)
+    return conn
+
+
+@contextlib.contextmanager
+def connection(path=DB_FILE):
+    """Borrow a pooled connection for the duration of the block."""
+    with _pool_lock:
+        idle = _idle.setdefault(path, [])
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = _connect(path)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        with _pool_lock:
+            idle = _idle.setdefault(path, [])
+            if len(idle) < POOL_SIZE:
+                idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+
+# --- Mood Logs ---
+def load_user_logs(username, path=DB_FILE):
+    # Served by idx_mood_logs_username_date: one seek plus a scan of the user's rows.
+    with connection(path) as conn:
+        return pd.read_sql_query(
+            "SELECT date, mood, note, username FROM mood_logs WHERE username = ? ORDER BY date, id",
+            conn,
+            params=(username,),
+        )
+
+
+def load_latest_mood(username, path=DB_FILE):
+    # Walks idx_mood_logs_username_date backwards, so this is a single index seek.
+    with connection(path) as conn:
+        row = conn.execute(
+            "SELECT mood FROM mood_logs WHERE username = ? ORDER BY date DESC, id DESC LIMIT 1",
+            (username,),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def load_user_version(username, path=DB_FILE):
+    """(entry count, newest row id) for one user; changes on every insert or delete."""
+    with connection(path) as conn:
+        return tuple(conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM mood_logs WHERE username = ?",
+            (username,),
+        ).fetchone())
+
+
+def load_all_logs(path=DB_FILE):
+    with connection(path) as conn:
+        return pd.read_sql_query("SELECT date, mood, note, username FROM mood_logs ORDER BY id", conn)
+
+
+# --- Routines ---
+def load_routine(date, username, path=DB_FILE):
+    with connection(path) as conn:
+        rows = conn.execute(
+            "SELECT activity FROM routines WHERE username = ? AND date = ? ORDER BY id",
+            (username, date),
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+# --- Batched Writes ---
+def write_batch(log_ops, routines, path=DB_FILE):
+    """
+    Apply a batch from the write queue in one transaction.
+    log_ops: ordered ("add", row) / ("clear", username, date) tuples.
+    routines: {(username, date): [activities]} replacing those days' routines.
+    """
+    with connection(path) as conn, conn:
+        # Take the write lock up front so other processes cannot interleave delete/insert.
+        conn.execute("BEGIN IMMEDIATE")
+        for op in log_ops:
+            if op[0] == "add":
+                row = op[1]
+                conn.execute(
+                    "INSERT INTO mood_logs (date, mood, note, username) VALUES (?, ?, ?, ?)",
+                    (row["date"], row["mood"], row.get("note") or "", row["username"]),
+                )
+            else:
+                conn.execute("DELETE FROM mood_logs WHERE username = ? AND date = ?", op[1:])
+        for (username, date), activities in routines.items():
+            conn.execute("DELETE FROM routines WHERE username = ? AND date = ?", (username, date))
+            conn.executemany(
+                "INSERT INTO routines (date, activity, username) VALUES (?, ?, ?)",
+                [(date, activity, username) for activity in activities],
+            )
+
+
+# --- Migration ---
+def is_migrated(path=DB_FILE):
+    with connection(path) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_csv'").fetchone()
+    return row is not None
+
+
+def migrate_from_frames(logs_df, routines_df, path=DB_FILE):
+    """One-off import of the CSV data. Does nothing if it has already run."""
+    with connection(path) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_csv'").fetchone():
+            return False
+        if not logs_df.empty:
+            logs = logs_df.reindex(columns=["date", "mood", "note", "username"]).fillna({"note": ""})
+            logs = logs.dropna(subset=["date", "mood", "username"])
+            conn.executemany(
+                "INSERT INTO mood_logs (date, mood, note, username) VALUES (?, ?, ?, ?)",
+                logs.astype(str).itertuples(index=False, name=None),
+            )
+        if not routines_df.empty:
+            routines = routines_df.reindex(columns=["date", "activity", "username"]).dropna()
+            conn.executemany(
+                "INSERT INTO routines (date, activity, username) VALUES (?, ?, ?)",
+                routines.astype(str).itertuples(index=False, name=None),
+            )
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('migrated_from_csv', datetime('now'))"
+        )
+    return True
+
+
+if __name__ == "__main__":
+    # python -m utils.sqlite_store  ->  copy mood_logs.csv / routines.csv into the database
+    from utils import data_store
+
+    migrated = migrate_from_frames(data_store.read_csv_logs(), data_store.read_csv_routines())
+    print("Migrated CSV data into", DB_FILE if migrated else f"{DB_FILE} (already migrated)")
@@ -0,0 +1,70 @@
+# utils/startup_timing.py
+"""
+How long a page's top-level imports take in a fresh interpreter, with and
+without the vision stack imported eagerly, as the Mood Tracker used to.
+
+    python -m utils.startup_timing
+    python -m utils.startup_timing "pages/1_📊Mood_Tracker.py" --repeats 5
+"""
+import argparse
+import ast
+import glob
+import statistics
+import subprocess
+import sys
+
+EAGER_VISION_IMPORTS = "import cv2\nfrom deepface import DeepFace\n"
+
+_PROBE = """
+import time, resource
+started = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - started
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def page_imports(page_path):
+    """The import statements at the top level of a page script."""
+    with open(page_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def measure(imports, repeats=3):
+    """(median seconds, peak RSS in MB) to run `imports` in a new Python process."""
+    timings, peaks = [], []
+    for _ in range(repeats):
+        probe = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(imports=imports)],
+            capture_output=True, text=True, check=False,
+        )
+        if probe.returncode:
+            raise RuntimeError(probe.stderr.strip().splitlines()[-1])
+        # stdout may carry library chatter; the probe's own line comes last.
+        seconds, max_rss_kb = probe.stdout.strip().splitlines()[-1].split()
+        timings.append(float(seconds))
+        peaks.append(int(max_rss_kb) / 1024)
+    return statistics.median(timings), max(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("page", nargs="?", default=(glob.glob("pages/1_*Mood_Tracker.py") or [None])[0])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    if not args.page:
+        parser.error("page script not found; pass its path")
+
+    imports = page_imports(args.page)
+    print(f"{args.page}, median of {args.repeats} cold starts")
+    for label, code in (("lazy vision stack", imports), ("eager DeepFace import", EAGER_VISION_IMPORTS + imports)):
+        try:
+            seconds, peak_mb = measure(code, args.repeats)
+            print(f"{label:<24}{seconds:>8.2f} s{peak_mb:>10.0f} MB")
+        except RuntimeError as e:
+            print(f"{label:<24}failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
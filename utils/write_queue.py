@@ -0,0 +1,75 @@
+# utils/write_queue.py
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class WriteBehindQueue:
+    """
+    Single background writer shared by every session in the process.
+
+    Callers submit mutations and get a Future back; the writer thread drains
+    whatever has queued up (up to max_batch, waiting at most max_delay for
+    stragglers) and hands the whole batch to flush_fn in one go. flush_fn must
+    apply a batch entirely or not at all: if it fails, the mutations are
+    retried one by one, so one bad mutation only fails its own Future.
+    """
+
+    def __init__(self, flush_fn, max_batch=500, max_delay=0.02):
+        self._flush_fn = flush_fn
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="mindmate-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, *args):
+        future = Future()
+        self._queue.put((kind, args, future))
+        return future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self._max_batch:
+            try:
+                batch.append(self._queue.get(timeout=self._max_delay))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if len(batch) == 1:
+                self._flush_one(batch[0])
+                continue
+            try:
+                self._flush_fn([(kind, args) for kind, args, _ in batch])
+            except Exception:
+                for item in batch:
+                    self._flush_one(item)
+            else:
+                for _, _, future in batch:
+                    future.set_result(True)
+
+    def _flush_one(self, item):
+        kind, args, future = item
+        try:
+            self._flush_fn([(kind, args)])
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(True)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer(flush_fn):
+    """The process-wide writer, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindQueue(flush_fn)
+    return _writer